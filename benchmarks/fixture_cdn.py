@@ -0,0 +1,203 @@
+"""
+CDN Wakfu local de test (aucun accès à Ankama)
+
+Génère des fichiers config.json / items.json / recipes.json / recipeIngredients.json /
+harvestLoots.json de tailles réalistes, avec la même arborescence que le CDN
+(<root>/config.json, <root>/<version>/<type>.json), et les sert via une petite app
+ASGI (ETag / Last-Modified / 304 comme le vrai CDN).
+
+Usage:
+    python -m benchmarks.fixture_cdn --root .fixture_cdn --items 8000 --serve --port 8765
+    WAKFU_CDN_BASE_URL=http://127.0.0.1:8765 python main.py
+"""
+
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+import uvicorn
+from fastapi import FastAPI
+from fastapi.staticfiles import StaticFiles
+
+FIXTURE_VERSION = "1.0.0.fixture"
+
+# Ordres de grandeur du CDN réel
+DEFAULT_ITEMS = 8000
+RECIPES_PER_ITEM = 0.4
+INGREDIENTS_PER_RECIPE = 4
+HARVEST_LOOTS_PER_ITEM = 0.15
+
+LANGUAGES = ("fr", "en", "es", "pt")
+
+def _translated(text: str) -> Dict[str, str]:
+    return {lang: f"{text} ({lang})" for lang in LANGUAGES}
+
+def _item(item_id: int, rng: random.Random) -> Dict:
+    """Item au format du CDN (definition.item + effets + textes traduits)"""
+    level = rng.randint(1, 230)
+    properties = []
+    if rng.random() < 0.03:
+        properties.append(7)  # Shop
+    elif rng.random() < 0.02:
+        properties.append(1)  # Trésor
+    return {
+        "definition": {
+            "item": {
+                "id": item_id,
+                "level": level,
+                "baseParameters": {
+                    "itemTypeId": rng.choice([101, 103, 108, 110, 112, 119, 120, 132, 133, 134, 136, 138]),
+                    "itemSetId": rng.choice([0, 0, 0, rng.randint(1, 600)]),
+                    "rarity": rng.randint(0, 7),
+                    "bindType": 0,
+                    "minimumShardSlotNumber": 1,
+                    "maximumShardSlotNumber": 4
+                },
+                "useParameters": {
+                    "useCostAp": 0, "useCostMp": 0, "useCostWp": 0,
+                    "useRangeMin": 0, "useRangeMax": 0,
+                    "useTestFreeCell": False, "useTestLos": False,
+                    "useTestOnlyLine": False, "useTestNoBorderCell": False,
+                    "useWorldTarget": 0
+                },
+                "graphicParameters": {"gfxId": item_id * 10, "femaleGfxId": item_id * 10},
+                "properties": properties
+            },
+            "useEffects": [],
+            "useCriticalEffects": [],
+            "equipEffects": [
+                {
+                    "effect": {
+                        "definition": {
+                            "id": rng.randint(1, 200000),
+                            "actionId": rng.choice([20, 26, 31, 41, 120, 149, 171, 173, 175, 191]),
+                            "areaShape": 32767,
+                            "areaSize": [],
+                            "params": [round(rng.uniform(1, 80), 1), round(rng.uniform(0, 1), 2), 0, 0]
+                        }
+                    }
+                }
+                for _ in range(rng.randint(3, 9))
+            ]
+        },
+        "title": _translated(f"Objet {item_id}"),
+        "description": _translated(f"Description générée pour l'objet {item_id} de niveau {level}")
+    }
+
+def _write_array(path: str, entries) -> int:
+    """Écrit un tableau JSON entrée par entrée (sans le garder en mémoire), retourne le nombre d'entrées"""
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[")
+        for entry in entries:
+            if count:
+                f.write(",")
+            json.dump(entry, f, ensure_ascii=False, separators=(",", ":"))
+            count += 1
+        f.write("]")
+    return count
+
+def generate_fixture(root: str, items: int = DEFAULT_ITEMS, version: str = FIXTURE_VERSION, seed: int = 42) -> Dict:
+    """
+    Génère un CDN de test déterministe dans root
+
+    Returns:
+        Nombre d'entrées et taille (octets) par fichier
+    """
+    rng = random.Random(seed)
+    version_dir = os.path.join(root, version)
+    os.makedirs(version_dir, exist_ok=True)
+
+    with open(os.path.join(root, "config.json"), "w", encoding="utf-8") as f:
+        json.dump({"version": version}, f)
+
+    item_ids = list(range(1, items + 1))
+    crafted_ids = rng.sample(item_ids, int(items * RECIPES_PER_ITEM))
+    harvested_ids = rng.sample(item_ids, int(items * HARVEST_LOOTS_PER_ITEM))
+
+    recipes = [
+        {"id": recipe_id, "categoryId": rng.randint(40, 80), "level": rng.randint(1, 230), "resultId": item_id, "resultQuantity": 1}
+        for recipe_id, item_id in enumerate(crafted_ids, start=1)
+    ]
+    ingredients = [
+        {"recipeId": recipe["id"], "itemId": rng.choice(item_ids), "quantity": rng.randint(1, 20), "ingredientOrder": order}
+        for recipe in recipes
+        for order in range(rng.randint(1, INGREDIENTS_PER_RECIPE * 2 - 1))
+    ]
+    harvest_loots = [
+        {"id": loot_id, "listId": rng.randint(1, 400), "itemId": item_id, "skillId": rng.choice([64, 71, 72, 73, 74, 75]),
+         "dropRate": round(rng.uniform(1, 100), 1), "quantityMin": 1, "quantityMax": rng.randint(1, 5)}
+        for loot_id, item_id in enumerate(harvested_ids, start=1)
+    ]
+
+    files = {
+        "items": (_item(item_id, rng) for item_id in item_ids),
+        "recipes": recipes,
+        "recipeIngredients": ingredients,
+        "harvestLoots": harvest_loots
+    }
+    summary = {"version": version, "files": {}}
+    for data_type, entries in files.items():
+        path = os.path.join(version_dir, f"{data_type}.json")
+        count = _write_array(path, entries)
+        summary["files"][data_type] = {"entries": count, "bytes": os.path.getsize(path)}
+    return summary
+
+def create_app(root: str) -> FastAPI:
+    """App ASGI servant root comme le CDN (ETag, Last-Modified, réponses 304)"""
+    app = FastAPI(title="Fixture Wakfu CDN")
+    app.mount("/", StaticFiles(directory=root), name="cdn")
+    return app
+
+class FixtureCDNServer:
+    """Serveur uvicorn du CDN de test dans un thread (pour les benchmarks)"""
+
+    def __init__(self, root: str, host: str = "127.0.0.1", port: int = 8765):
+        self.base_url = f"http://{host}:{port}"
+        self._server = uvicorn.Server(uvicorn.Config(create_app(root), host=host, port=port, log_level="warning"))
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not self._server.started:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError(f"Le CDN de test n'a pas démarré sur {self.base_url}")
+            time.sleep(0.05)
+
+    def stop(self):
+        self._server.should_exit = True
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="CDN Wakfu local de test")
+    parser.add_argument("--root", default=".fixture_cdn", help="Répertoire des fichiers générés")
+    parser.add_argument("--items", type=int, default=DEFAULT_ITEMS, help="Nombre d'items générés")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--serve", action="store_true", help="Servir le répertoire après génération")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    summary = generate_fixture(args.root, items=args.items, seed=args.seed)
+    print(json.dumps(summary, indent=2))
+
+    if args.serve:
+        print(f"CDN de test: WAKFU_CDN_BASE_URL=http://{args.host}:{args.port}")
+        uvicorn.run(create_app(args.root), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,150 @@
+"""
+Benchmark de la synchro CDN de bout en bout, contre le CDN local de test
+
+Mesure séparément chaque étape (téléchargement, parsing, index d'obtention,
+classification, écriture) via les points d'entrée publics de la synchro, puis une
+synchro complète (sync_items_from_cdn) sur une base et un miroir vides.
+Par défaut tout est isolé dans un répertoire temporaire (miroir CDN + base SQLite).
+
+Usage:
+    python -m benchmarks.sync_benchmark --items 8000
+    python -m benchmarks.sync_benchmark --database-url postgresql://... --output bench_history.jsonl
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import socket
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Dict
+
+from benchmarks.fixture_cdn import DEFAULT_ITEMS, FixtureCDNServer, generate_fixture
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def _stage(seconds: float, count: int) -> Dict:
+    return {"seconds": round(seconds, 3), "count": count, "per_second": round(count / seconds) if seconds > 0 else None}
+
+async def run_stages(items_count: int, mirror_dir: str) -> Dict:
+    """Exécute chaque étape de la synchro séparément puis la synchro complète"""
+    # Imports après la configuration de l'environnement (settings lus à l'import)
+    from core.database import Base, SessionLocal, engine
+    from models import build, cache, generation, recipes, zones  # noqa: F401 - chargement des modèles
+    from models.cache import CachedItem
+    from services.analysis import analysis_service
+    from services.wakfu_cdn import SYNC_DATA_TYPES, wakfu_cdn
+
+    Base.metadata.create_all(bind=engine)
+    results = {"stages": {}}
+    stages = results["stages"]
+
+    def clear_items():
+        db = SessionLocal()
+        try:
+            db.query(CachedItem).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    try:
+        # 1. Téléchargement en flux vers le miroir (vide)
+        version = await wakfu_cdn.get_current_version()
+        started = time.perf_counter()
+        data, timings = await wakfu_cdn.fetch_many(SYNC_DATA_TYPES, version=version, stream=True)
+        stages["fetch"] = _stage(time.perf_counter() - started, len(SYNC_DATA_TYPES))
+        stages["fetch"]["bytes"] = sum(data[data_type].size_bytes for data_type in SYNC_DATA_TYPES if data[data_type])
+        stages["fetch"]["per_file"] = {key: round(value, 3) for key, value in timings.items()}
+
+        # 2. Parsing paresseux des fichiers
+        started = time.perf_counter()
+        parsed = {data_type: list(data[data_type] or []) for data_type in SYNC_DATA_TYPES}
+        stages["parse"] = _stage(time.perf_counter() - started, sum(len(entries) for entries in parsed.values()))
+
+        # 3-5. Cache des items sur une table vide: index d'obtention, classification, écriture
+        clear_items()
+        cache_stats = await analysis_service.update_items_cache(
+            items=parsed["items"], recipes=parsed["recipes"], harvest_loots=parsed["harvestLoots"]
+        )
+        if "error" in cache_stats:
+            results["error"] = cache_stats["error"]
+        cache_timings = cache_stats["timings"]
+        items_seen = cache_stats["source_counts"]["items"]
+        stages["index"] = _stage(cache_timings["index"], cache_stats["source_counts"]["recipes"])
+        stages["classify"] = _stage(cache_timings["classify"], items_seen)
+        stages["classify"]["workers"] = cache_stats["workers"]
+        stages["write"] = _stage(cache_timings["write"], cache_stats["items_written"])
+        stages["write"]["chunks"] = cache_stats["chunks"]
+
+        # 6. Synchro complète: miroir et table vidés, donc téléchargement réel
+        clear_items()
+        shutil.rmtree(mirror_dir, ignore_errors=True)
+        started = time.perf_counter()
+        sync_result = await analysis_service.sync_items_from_cdn(force=True)
+        stages["end_to_end"] = _stage(time.perf_counter() - started, sync_result.get("source_counts", {}).get("items", 0))
+        stages["end_to_end"]["status"] = sync_result["status"]
+        stages["end_to_end"]["timings"] = {key: round(value, 3) for key, value in sync_result.get("timings", {}).items()}
+        stages["end_to_end"]["fetch_seconds"] = {
+            key: round(value, 3) for key, value in sync_result.get("fetch_seconds", {}).items()
+        }
+    finally:
+        await wakfu_cdn.close()
+
+    if stages["classify"]["count"] != items_count:
+        results["warning"] = f"{stages['classify']['count']} items classés pour {items_count} générés"
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la synchro CDN (CDN local de test)")
+    parser.add_argument("--items", type=int, default=DEFAULT_ITEMS, help="Nombre d'items générés")
+    parser.add_argument("--database-url", help="Base cible (défaut: SQLite temporaire)")
+    parser.add_argument("--workers", type=int, help="ANALYSIS_WORKERS (défaut: configuration)")
+    parser.add_argument("--output", help="Fichier JSONL auquel ajouter le résultat (suivi entre versions)")
+    parser.add_argument("--keep", action="store_true", help="Conserver le répertoire temporaire")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="wakdrop_bench_")
+    fixture_root = os.path.join(workdir, "cdn")
+    print(f"Génération du CDN de test ({args.items} items) dans {workdir}...")
+    fixture = generate_fixture(fixture_root, items=args.items)
+
+    server = FixtureCDNServer(fixture_root, port=_free_port())
+    os.environ["WAKFU_CDN_BASE_URL"] = server.base_url
+    mirror_dir = os.path.join(workdir, "mirror")
+    os.environ["CDN_CACHE_DIR"] = mirror_dir
+    os.environ["CDN_OFFLINE"] = "false"
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    if args.workers is not None:
+        os.environ["ANALYSIS_WORKERS"] = str(args.workers)
+
+    try:
+        with server:
+            results = asyncio.run(run_stages(args.items, mirror_dir))
+    finally:
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    results.update({
+        "date": datetime.now(timezone.utc).isoformat(),
+        "items": args.items,
+        "fixture_bytes": {key: value["bytes"] for key, value in fixture["files"].items()},
+        "database": "sqlite" if not args.database_url else args.database_url.split(":", 1)[0],
+        "python": sys.version.split()[0],
+        "platform": platform.platform()
+    })
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "a", encoding="utf-8") as f:
+            f.write(json.dumps(results) + "\n")
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
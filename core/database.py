@@ -12,4 +12,15 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def upsert_insert(table):
+    """
+    Retourne un INSERT supportant ON CONFLICT pour le dialecte de l'engine
+    (PostgreSQL en production, SQLite pour les tests locaux)
+    """
+    if engine.dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert
+    return insert(table)
\ No newline at end of file
@@ -0,0 +1,37 @@
+"""
+ETags et requêtes conditionnelles (If-None-Match -> 304)
+
+Les ETags sont dérivés des versions des données (générations, empreintes de
+contenu) et non du corps de la réponse: un client à jour reçoit un 304 avant que
+la réponse ne soit générée ou sérialisée.
+"""
+
+import hashlib
+
+from fastapi import Request, Response
+
+# Les clients peuvent garder la réponse mais doivent la revalider à chaque usage
+CACHE_CONTROL = "no-cache"
+
+def make_etag(*parts) -> str:
+    """ETag fort à partir des versions des données dont dépend la réponse"""
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f'"{digest}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Vrai si l'en-tête If-None-Match de la requête correspond à l'ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # If-None-Match utilise la comparaison faible: le préfixe W/ est ignoré
+    candidates = (tag.strip() for tag in header.split(","))
+    return any((tag[2:] if tag.startswith("W/") else tag) == etag for tag in candidates)
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+def set_etag(response: Response, etag: str):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
\ No newline at end of file
@@ -0,0 +1,135 @@
+"""
+Mises à jour de schéma idempotentes pour les bases existantes
+
+Base.metadata.create_all() crée les tables manquantes mais ne modifie pas les
+tables existantes: les colonnes/index ajoutés depuis sont appliqués ici. Les
+rattrapages de données (lignes à dériver de tables existantes) sont des migrations
+exécutées une seule fois par base, enregistrées dans schema_migrations.
+"""
+
+import json
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+# Instructions PostgreSQL, ré-exécutables sans effet de bord
+SCHEMA_UPDATES = [
+    "ALTER TABLE cached_items ADD COLUMN IF NOT EXISTS content_hash VARCHAR(40)",
+    "ALTER TABLE farm_analysis ADD COLUMN IF NOT EXISTS item_name VARCHAR",
+    "ALTER TABLE farm_analysis ADD COLUMN IF NOT EXISTS item_hash VARCHAR(40)",
+    "CREATE INDEX IF NOT EXISTS ix_builds_created_at_id ON builds (created_at, id)",
+    "ALTER TABLE builds ADD COLUMN IF NOT EXISTS content_hash VARCHAR(40)",
+    "CREATE INDEX IF NOT EXISTS ix_builds_content_hash ON builds (content_hash)",
+    "ALTER TABLE build_contents ADD COLUMN IF NOT EXISTS items_revision INTEGER NOT NULL DEFAULT 0",
+]
+
+# Index uniques ajoutés sur des tables existantes: (nom, dédoublonnage, création).
+# Le dédoublonnage (auto-jointure complète) ne s'exécute que si l'index n'existe pas encore.
+UNIQUE_INDEXES = [
+    # Une seule analyse par (build, item): on garde la plus récente
+    ("uq_farm_analysis_build_item",
+     "DELETE FROM farm_analysis a USING farm_analysis b "
+     "WHERE a.build_id = b.build_id AND a.item_id = b.item_id AND a.id < b.id",
+     "CREATE UNIQUE INDEX IF NOT EXISTS uq_farm_analysis_build_item ON farm_analysis (build_id, item_id)"),
+    # Une seule association par (zone, monstre): on garde la première
+    ("uq_monster_zones_zone_monster",
+     "DELETE FROM monster_zones a USING monster_zones b "
+     "WHERE a.zone_id = b.zone_id AND a.monster_id = b.monster_id AND a.id > b.id",
+     "CREATE UNIQUE INDEX IF NOT EXISTS uq_monster_zones_zone_monster ON monster_zones (zone_id, monster_id)"),
+    # Un seul drop par (monstre, item): on garde le premier (ingestions concurrentes)
+    ("uq_monster_drops_monster_item",
+     "DELETE FROM monster_drops a USING monster_drops b "
+     "WHERE a.monster_id = b.monster_id AND a.item_id = b.item_id AND a.id > b.id",
+     "CREATE UNIQUE INDEX IF NOT EXISTS uq_monster_drops_monster_item ON monster_drops (monster_id, item_id)"),
+]
+
+def _link_build_contents(conn: Connection):
+    """Rattache à leur contenu partagé (build_contents) les builds créés avant l'empreinte"""
+    from services.roadmaps import build_content_hash
+
+    builds = conn.execute(text("SELECT id, items_ids FROM builds WHERE content_hash IS NULL ORDER BY id")).all()
+    if not builds:
+        return
+    rows = [
+        {"build_id": build_id, "content_hash": build_content_hash(items_ids),
+         "items_ids": json.dumps(sorted(items_ids))}
+        for build_id, items_ids in builds
+    ]
+    # Dans l'ordre des ids: le premier build d'un contenu en porte les analyses
+    conn.execute(text(
+        "INSERT INTO build_contents (content_hash, items_ids, first_build_id) "
+        "VALUES (:content_hash, CAST(:items_ids AS JSON), :build_id) "
+        "ON CONFLICT (content_hash) DO UPDATE "
+        "SET first_build_id = COALESCE(build_contents.first_build_id, EXCLUDED.first_build_id)"
+    ), rows)
+    conn.execute(text("UPDATE builds SET content_hash = :content_hash WHERE id = :build_id"), rows)
+
+# Migrations de données PostgreSQL, exécutées une seule fois (dans l'ordre):
+# instructions SQL, ou fonctions recevant la connexion
+DATA_MIGRATIONS = [
+    # Builds créés avant build_contents: empreinte calculée en Python (SHA-1 des items triés)
+    ("build_contents_from_builds", [_link_build_contents]),
+    # Builds créés avant l'index build_items: une ligne par item distinct (quantité = occurrences)
+    ("build_items_from_builds", [
+        "INSERT INTO build_items (build_id, item_id, quantity) "
+        "SELECT b.id, e.value::int, COUNT(*) "
+        "FROM builds b CROSS JOIN LATERAL json_array_elements_text(b.items_ids::json) AS e(value) "
+        "WHERE NOT EXISTS (SELECT 1 FROM build_items i WHERE i.build_id = b.id) "
+        "GROUP BY b.id, e.value::int "
+        "ON CONFLICT DO NOTHING",
+    ]),
+    # Monstres connus seulement par monster_drops (imports antérieurs au catalogue):
+    # ajoutés à cached_monsters, puis génération des drops incrémentée (index de recherche)
+    ("monster_catalog_from_drops", [
+        "INSERT INTO cached_monsters (wakfu_id, name, family_id, level, data_json) "
+        "SELECT d.monster_id, MIN(d.monster_name), MAX(d.monster_family_id), MAX(d.monster_level), "
+        "json_build_object('name', MIN(d.monster_name), 'level', MAX(d.monster_level), 'source', 'monster_drops') "
+        "FROM monster_drops d "
+        "WHERE NOT EXISTS (SELECT 1 FROM cached_monsters c WHERE c.wakfu_id = d.monster_id) "
+        "GROUP BY d.monster_id "
+        "ON CONFLICT (wakfu_id) DO NOTHING",
+        "INSERT INTO data_generations (name, value) VALUES ('drops', 1) "
+        "ON CONFLICT (name) DO UPDATE SET value = data_generations.value + 1, updated_at = now()",
+    ]),
+]
+
+# Verrou consultatif des mises à jour de schéma (workers démarrés en même temps)
+SCHEMA_LOCK_KEY = 7201
+
+def apply_schema_updates(engine: Engine):
+    """
+    Applique SCHEMA_UPDATES, les UNIQUE_INDEXES manquants puis les DATA_MIGRATIONS
+    pas encore enregistrées (les bases SQLite de test sont créées à jour par create_all)
+    """
+    if engine.dialect.name != "postgresql":
+        return
+
+    with engine.begin() as conn:
+        # Un seul processus à la fois; les suivants trouvent les migrations déjà enregistrées
+        conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": SCHEMA_LOCK_KEY})
+        for statement in SCHEMA_UPDATES:
+            conn.execute(text(statement))
+
+        existing_indexes = set(conn.execute(
+            text("SELECT indexname FROM pg_indexes WHERE schemaname = current_schema()")
+        ).scalars())
+        for index_name, dedup, create in UNIQUE_INDEXES:
+            if index_name not in existing_indexes:
+                conn.execute(text(dedup))
+                conn.execute(text(create))
+
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations "
+            "(name VARCHAR(100) PRIMARY KEY, applied_at TIMESTAMPTZ NOT NULL DEFAULT now())"
+        ))
+        applied = set(conn.execute(text("SELECT name FROM schema_migrations")).scalars())
+        for name, statements in DATA_MIGRATIONS:
+            if name in applied:
+                continue
+            for statement in statements:
+                if callable(statement):
+                    statement(conn)
+                else:
+                    conn.execute(text(statement))
+            conn.execute(text("INSERT INTO schema_migrations (name) VALUES (:name)"), {"name": name})
+            print(f"Migration de données appliquée: {name}")
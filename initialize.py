@@ -5,8 +5,9 @@ Script d'initialisation complet pour WakDrop Backend
 Ce script:
 1. Crée les tables de la base de données
 2. Synchronise les données du CDN Wakfu (items, recettes, etc.)
-3. Lance un scraping initial des monstres et leurs drops
-4. Génère un rapport d'initialisation
+3. Importe les monstres, leurs drops et les zones depuis le CDN
+4. (optionnel) Lance un scraping des monstres et leurs drops
+5. Génère un rapport d'initialisation
 
 Usage:
     python initialize.py [--pages N] [--headless]
@@ -33,9 +34,11 @@ async def create_database_tables():
     
     try:
         from core.database import engine, Base
-        from models import build, cache  # Import pour charger les modèles
+        from core.schema import apply_schema_updates
+        from models import build, cache, zones, recipes, generation  # Import pour charger les modèles
         
         Base.metadata.create_all(bind=engine)
+        apply_schema_updates(engine)
         logger.info("✅ Tables créées avec succès")
         return True
     except Exception as e:
@@ -50,47 +53,76 @@ async def sync_cdn_data():
         from services.wakfu_cdn import wakfu_cdn
         from services.analysis import analysis_service
         
-        # Récupérer la version actuelle
-        version = await wakfu_cdn.get_current_version()
-        logger.info(f"📌 Version CDN: {version}")
+        # Récupérer les données (téléchargements en parallèle, miroir local),
+        # puis les analyser et les mettre en cache
+        logger.info("📥 Récupération des items, recettes et loots de récolte...")
+        sync_result = await analysis_service.sync_items_from_cdn()
+        logger.info(f"📌 Version CDN: {sync_result['version']}")
+        logger.info(f"⏱️ Téléchargement CDN terminé en {sync_result['fetch_seconds']['total']:.1f}s")
         
-        # Récupérer les données
-        logger.info("📥 Récupération des items...")
-        items = await wakfu_cdn.get_items()
-        
-        logger.info("📥 Récupération des recettes...")
-        recipes = await wakfu_cdn.get_recipes()
-        
-        logger.info("📥 Récupération des loots de récolte...")
-        harvest_loots = await wakfu_cdn.get_harvest_loots()
+        if sync_result["status"] == "error":
+            logger.warning("⚠️ Aucun item récupéré depuis le CDN")
+            return None
         
-        if items:
-            logger.info(f"📦 {len(items)} items récupérés")
-            
-            # Analyser et mettre en cache
-            await analysis_service.update_items_cache(
-                items=items or [],
-                recipes=recipes or [],
-                harvest_loots=harvest_loots or []
-            )
-            
-            logger.info("✅ Données CDN synchronisées et analysées")
+        if sync_result["status"] == "up_to_date":
+            logger.info("✅ Données CDN déjà à jour, analyse ignorée")
             return {
-                'version': version,
-                'items_count': len(items) if items else 0,
-                'recipes_count': len(recipes) if recipes else 0,
-                'harvest_loots_count': len(harvest_loots) if harvest_loots else 0
+                'version': sync_result['version'],
+                'status': 'up_to_date',
+                'fetch_seconds': sync_result['fetch_seconds']
             }
-        else:
-            logger.warning("⚠️ Aucun item récupéré depuis le CDN")
-            return None
+        
+        counts = sync_result["source_counts"]
+        delta = sync_result["delta"]
+        logger.info(f"📦 {counts['items']} items récupérés")
+        logger.info(
+            f"🔁 {delta['inserted']} ajoutés, {delta['updated']} modifiés, "
+            f"{delta['removed']} supprimés, {delta['unchanged']} inchangés"
+        )
+        logger.info("✅ Données CDN synchronisées et analysées")
+        return {
+            'version': sync_result['version'],
+            'items_count': counts['items'],
+            'recipes_count': counts['recipes'],
+            'harvest_loots_count': counts['harvest_loots'],
+            'delta': delta,
+            'fetch_seconds': sync_result['fetch_seconds'],
+            'cache_timings': sync_result['timings']
+        }
             
     except Exception as e:
         logger.error(f"❌ Erreur synchronisation CDN: {e}")
         return None
-    finally:
-        if 'wakfu_cdn' in locals():
-            await wakfu_cdn.close()
+
+async def sync_cdn_drops():
+    """Importe les monstres, leurs drops et les zones depuis le CDN Wakfu"""
+    logger.info("👾 Import des monstres, drops et zones depuis le CDN...")
+    
+    try:
+        from services.cdn_ingestion import cdn_ingestion
+        
+        result = await cdn_ingestion.ingest_drops_from_cdn()
+        
+        if result["status"] == "error":
+            logger.warning(f"⚠️ {result['message']}")
+            return None
+        
+        if result["status"] == "up_to_date":
+            logger.info("✅ Données de drop déjà à jour")
+        else:
+            logger.info(f"""
+        ✅ Import terminé en {result['timings']['total']:.1f}s:
+        - Monstres: {result['monsters_upserted']}
+        - Zones: {result['zones_upserted']}
+        - Associations monstre/zone ajoutées: {result['monster_zones_added']}
+        - Drops ajoutés: {result['drops_added']}
+        - Drops mis à jour: {result['drops_updated']}
+        """)
+        return result
+        
+    except Exception as e:
+        logger.error(f"❌ Erreur import drops CDN: {e}")
+        return None
 
 async def scrape_initial_monsters(pages: int = 5, headless: bool = True):
     """
@@ -170,6 +202,7 @@ async def generate_init_report(results: Dict[str, Any]):
         'timestamp': datetime.now().isoformat(),
         'database': results.get('database', False),
         'cdn_sync': results.get('cdn_sync'),
+        'cdn_drops': results.get('cdn_drops'),
         'scraping': results.get('scraping'),
         'api_test': results.get('api_test')
     }
@@ -191,7 +224,7 @@ async def generate_init_report(results: Dict[str, Any]):
     Endpoints principaux:
     - POST /builds/ : Parser un build Zenith
     - GET /builds/{id}/roadmap : Obtenir la roadmap de farm
-    - POST /drops/scrape : Lancer plus de scraping si besoin
+    - POST /cdn/sync-drops : Ré-importer les drops depuis le CDN
     - GET /drops/stats : Voir les statistiques
     
     Rapport sauvegardé dans: init_report.json
@@ -204,8 +237,8 @@ async def main():
     parser.add_argument(
         '--pages', 
         type=int, 
-        default=5,
-        help='Nombre de pages de monstres à scraper (défaut: 5, ~100 monstres)'
+        default=0,
+        help='Nombre de pages de monstres à scraper (défaut: 0, les drops viennent du CDN)'
     )
     parser.add_argument(
         '--headless',
@@ -237,19 +270,25 @@ async def main():
     # 2. Synchroniser le CDN
     results['cdn_sync'] = await sync_cdn_data()
     
-    # 3. Scraper les monstres (optionnel)
-    if not args.skip_scraping:
+    # 3. Importer les monstres, drops et zones du CDN
+    results['cdn_drops'] = await sync_cdn_drops()
+    
+    from services.wakfu_cdn import wakfu_cdn
+    await wakfu_cdn.close()
+    
+    # 4. Scraper les monstres (optionnel, obsolète)
+    if not args.skip_scraping and args.pages > 0:
         results['scraping'] = await scrape_initial_monsters(
             pages=args.pages,
             headless=args.headless
         )
     else:
-        logger.info("⏭️ Scraping ignoré (--skip-scraping)")
+        logger.info("⏭️ Scraping ignoré")
     
-    # 4. Tester l'API
+    # 5. Tester l'API
     results['api_test'] = await test_api_endpoints()
     
-    # 5. Générer le rapport
+    # 6. Générer le rapport
     await generate_init_report(results)
 
 if __name__ == "__main__":
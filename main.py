@@ -1,16 +1,28 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from core.database import engine, Base
+from core.schema import apply_schema_updates
 from routers import builds, items, cdn, drops, admin, search, zones_admin
+from services.wakfu_cdn import wakfu_cdn
 
-# Créer les tables
+# Créer les tables (et mettre à jour celles qui existent déjà)
 Base.metadata.create_all(bind=engine)
+apply_schema_updates(engine)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Client HTTP du CDN partagé par toutes les synchros pendant la vie de l'app
+    await wakfu_cdn.start()
+    yield
+    await wakfu_cdn.close()
 
 app = FastAPI(
     title="WakDrop API",
     description="API pour analyser les builds Wakfu et générer des roadmaps de farm optimisées",
-    version="0.4.0"
+    version="0.4.0",
+    lifespan=lifespan
 )
 
 app.add_middleware(
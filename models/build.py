@@ -1,12 +1,46 @@
-from sqlalchemy import Column, Integer, String, DateTime, JSON
+from sqlalchemy import Column, Integer, String, DateTime, JSON, ForeignKey, Index
 from sqlalchemy.sql import func
 from core.database import Base
 
 class Build(Base):
     __tablename__ = "builds"
+    __table_args__ = (
+        # Pagination par curseur sur (created_at, id)
+        Index("ix_builds_created_at_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     build_name = Column(String, index=True, nullable=False)
     items_ids = Column(JSON, nullable=False)
+    content_hash = Column(String(40), index=True, nullable=True)  # -> build_contents (builds identiques)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+class BuildContent(Base):
+    """
+    Contenu d'un build identifié par l'empreinte de ses items triés: les builds
+    identiques (même items, noms différents) partagent ce contenu et sa roadmap
+    pré-calculée, stampée avec les générations des données (drops, zones, sources
+    de récolte) et la révision de ses items dont elle est issue
+    """
+    __tablename__ = "build_contents"
+    
+    content_hash = Column(String(40), primary_key=True)
+    items_ids = Column(JSON, nullable=False)  # Items triés
+    first_build_id = Column(Integer, nullable=True)  # Build portant les analyses de farm partagées
+    roadmap = Column(JSON, nullable=True)
+    generations = Column(JSON, nullable=True)  # {"drops": n, "zones": n, "harvest": n, "items": items_revision}
+    items_revision = Column(Integer, nullable=False, default=0, server_default="0")  # Incrémentée quand un de ses items change
+    computed_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class BuildItem(Base):
+    """
+    Association normalisée build -> items (copie indexée de Build.items_ids),
+    pour les recherches inverses "quels builds utilisent cet item"
+    """
+    __tablename__ = "build_items"
+    
+    build_id = Column(Integer, ForeignKey("builds.id", ondelete="CASCADE"), primary_key=True)
+    item_id = Column(Integer, primary_key=True, index=True)
+    quantity = Column(Integer, nullable=False, default=1)  # Exemplaires dans le build (ex: 2 anneaux identiques)
\ No newline at end of file
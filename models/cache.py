@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, JSON, Text, Float
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Text, Float, UniqueConstraint
 from sqlalchemy.sql import func
 from core.database import Base
 
@@ -9,20 +9,30 @@ class CachedItem(Base):
     wakfu_id = Column(Integer, unique=True, index=True, nullable=False)
     data_json = Column(JSON, nullable=False)
     obtention_type = Column(String, nullable=True)
+    content_hash = Column(String(40), nullable=True)  # Empreinte SHA-1 de data_json + obtention_type
     last_updated = Column(DateTime(timezone=True), server_default=func.now())
 
 class FarmAnalysis(Base):
     __tablename__ = "farm_analysis"
+    __table_args__ = (
+        UniqueConstraint("build_id", "item_id", name="uq_farm_analysis_build_item"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     build_id = Column(Integer, index=True, nullable=False)
     item_id = Column(Integer, nullable=False)
     obtention_type = Column(String, nullable=False)  # "craft", "drop", "shop", "quest"
     farm_data = Column(JSON, nullable=True)
+    item_name = Column(String, nullable=True)
+    item_hash = Column(String(40), nullable=True)  # content_hash de l'item analysé (détection des analyses périmées)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 class MonsterDrop(Base):
     __tablename__ = "monster_drops"
+    __table_args__ = (
+        # Un seul taux par (monstre, item): cible des ON CONFLICT de l'ingestion CDN
+        UniqueConstraint("monster_id", "item_id", name="uq_monster_drops_monster_item"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     monster_id = Column(Integer, index=True, nullable=False)
@@ -35,6 +45,18 @@ class MonsterDrop(Base):
     zone_name = Column(String, nullable=True)
     last_updated = Column(DateTime(timezone=True), server_default=func.now())
 
+class HarvestSource(Base):
+    __tablename__ = "harvest_sources"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    item_id = Column(Integer, index=True, nullable=False)
+    resource_id = Column(Integer, nullable=True)  # Ressource récoltée (listId des harvestLoots)
+    skill_id = Column(Integer, nullable=True)  # Métier de récolte
+    drop_rate = Column(Float, nullable=True)  # Taux en pourcentage
+    quantity_min = Column(Integer, nullable=True)
+    quantity_max = Column(Integer, nullable=True)
+    last_updated = Column(DateTime(timezone=True), server_default=func.now())
+
 class CachedMonster(Base):
     __tablename__ = "cached_monsters"
     
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, DateTime
+from sqlalchemy.sql import func
+from core.database import Base
+
+class DataGeneration(Base):
+    """
+    Compteur de génération par jeu de données ("items", "drops", "zones"),
+    incrémenté à chaque modification: les résultats pré-calculés portent les
+    générations dont ils sont issus pour détecter qu'ils sont périmés
+    """
+    __tablename__ = "data_generations"
+    
+    name = Column(String(50), primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
\ No newline at end of file
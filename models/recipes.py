@@ -0,0 +1,28 @@
+from sqlalchemy import Column, Integer, DateTime, JSON
+from sqlalchemy.sql import func
+from core.database import Base
+
+class RecipeIngredient(Base):
+    """
+    Graphe des recettes: une ligne par ingrédient, indexée par item produit
+    """
+    __tablename__ = "recipe_ingredients"
+
+    id = Column(Integer, primary_key=True, index=True)
+    recipe_id = Column(Integer, index=True, nullable=False)
+    result_item_id = Column(Integer, index=True, nullable=False)
+    result_quantity = Column(Integer, nullable=False, default=1)  # Exemplaires produits par craft
+    ingredient_item_id = Column(Integer, nullable=False)
+    quantity = Column(Integer, nullable=False)  # Quantité d'ingrédient par craft
+
+class CraftMaterials(Base):
+    """
+    Arbre de craft développé (calculé une fois par synchro):
+    matériaux de base nécessaires pour 1 exemplaire de l'item
+    """
+    __tablename__ = "craft_materials"
+
+    item_id = Column(Integer, primary_key=True)
+    materials = Column(JSON, nullable=False)  # {"<wakfu_id>": quantité}
+    depth = Column(Integer, nullable=False)  # Niveaux de craft intermédiaires
+    computed_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from core.database import Base
@@ -25,6 +25,9 @@ class MonsterZone(Base):
     Un monstre peut être dans plusieurs zones, une zone peut avoir plusieurs monstres
     """
     __tablename__ = "monster_zones"
+    __table_args__ = (
+        UniqueConstraint("zone_id", "monster_id", name="uq_monster_zones_zone_monster"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     monster_id = Column(Integer, nullable=False, index=True)  # ID du monstre depuis monster_drops
@@ -10,6 +10,7 @@ from pydantic import BaseModel
 from core.database import get_db
 from services.wakfu_cdn import wakfu_cdn
 from services.analysis import analysis_service
+from services.cdn_ingestion import cdn_ingestion
 # from services.selenium_scraper import WakfuSeleniumScraper  # Module supprimé
 import asyncio
 import logging
@@ -19,9 +20,10 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/admin", tags=["admin"])
 
 class InitRequest(BaseModel):
-    scrape_pages: int = 5
+    scrape_pages: int = 0  # Scraping Selenium (obsolète, remplacé par ingest_drops)
     headless: bool = True
     sync_cdn: bool = True
+    ingest_drops: bool = True  # Monstres, drops et zones depuis le CDN
 
 class InitStatus:
     """Singleton pour suivre le statut de l'initialisation"""
@@ -47,10 +49,10 @@ async def initialize_system(
     
     Cette opération:
     1. Synchronise les données du CDN Wakfu (items, recettes)
-    2. Lance le scraping des monstres et leurs drops
+    2. Importe les monstres, leurs drops et les zones depuis le CDN
     3. Prépare la base de données pour l'utilisation
     
-    ⚠️ ATTENTION: Cette opération peut prendre 10-30 minutes selon le nombre de pages!
+    ⚠️ Le scraping (scrape_pages > 0) peut prendre 10-30 minutes selon le nombre de pages!
     """
     if init_status.is_running:
         raise HTTPException(
@@ -68,19 +70,28 @@ async def initialize_system(
             if request.sync_cdn:
                 init_status.progress = {"step": "cdn_sync", "details": "Synchronisation CDN..."}
                 
-                items = await wakfu_cdn.get_items()
-                recipes = await wakfu_cdn.get_recipes()
-                harvest_loots = await wakfu_cdn.get_harvest_loots()
+                sync_result = await analysis_service.sync_items_from_cdn()
+                init_status.progress["cdn_status"] = sync_result["status"]
+                init_status.progress["cdn_fetch_seconds"] = sync_result["fetch_seconds"]
                 
-                if items:
-                    await analysis_service.update_items_cache(
-                        items=items or [],
-                        recipes=recipes or [],
-                        harvest_loots=harvest_loots or []
-                    )
-                    init_status.progress["cdn_items"] = len(items) if items else 0
+                if "source_counts" in sync_result:
+                    init_status.progress["cdn_items"] = sync_result["source_counts"]["items"]
+                    init_status.progress["cdn_delta"] = sync_result["delta"]
             
-            # Étape 2: Scraping des monstres
+            # Étape 2: Import des monstres, drops et zones depuis le CDN
+            if request.ingest_drops:
+                init_status.progress["step"] = "cdn_drops"
+                init_status.progress["details"] = "Import des drops CDN..."
+                
+                drops_result = await cdn_ingestion.ingest_drops_from_cdn()
+                init_status.progress["drops_status"] = drops_result["status"]
+                for key in ("monsters_upserted", "zones_upserted", "monster_zones_added", "drops_added", "drops_updated"):
+                    if key in drops_result:
+                        init_status.progress[key] = drops_result[key]
+                if drops_result["status"] == "error":
+                    init_status.errors.append(drops_result["message"])
+            
+            # Étape 3: Scraping des monstres (optionnel)
             if request.scrape_pages > 0:
                 init_status.progress = {
                     "step": "scraping",
@@ -115,14 +126,12 @@ async def initialize_system(
             
         finally:
             init_status.is_running = False
-            if 'wakfu_cdn' in locals():
-                await wakfu_cdn.close()
     
     background_tasks.add_task(run_initialization)
     
     return {
         "message": "Initialisation lancée en arrière-plan",
-        "estimated_time": f"{request.scrape_pages * 3} minutes environ",
+        "estimated_time": f"{request.scrape_pages * 3} minutes environ" if request.scrape_pages else "moins d'une minute",
         "check_status": "/admin/init-status"
     }
 
@@ -136,7 +145,7 @@ async def get_initialization_status():
     }
 
 @router.post("/quick-setup")
-async def quick_setup(db: Session = Depends(get_db)):
+async def quick_setup(force: bool = False, db: Session = Depends(get_db)):
     """
     ⚡ Setup rapide: synchronise seulement le CDN (sans scraping)
     
@@ -144,37 +153,37 @@ async def quick_setup(db: Session = Depends(get_db)):
     - Tester rapidement l'application
     - Mettre à jour les données d'items
     - Préparer la base avant un import manuel
+    
+    Si les fichiers CDN n'ont pas changé depuis la dernière synchro, rien n'est
+    re-téléchargé ni ré-analysé (sauf avec force=true).
     """
     try:
-        # Sync CDN uniquement
-        items = await wakfu_cdn.get_items()
-        recipes = await wakfu_cdn.get_recipes()
-        harvest_loots = await wakfu_cdn.get_harvest_loots()
+        # Sync CDN uniquement (téléchargements en parallèle, miroir local)
+        sync_result = await analysis_service.sync_items_from_cdn(force=force)
         
         results = {
-            "items": len(items) if items else 0,
-            "recipes": len(recipes) if recipes else 0,
-            "harvest_loots": len(harvest_loots) if harvest_loots else 0
+            "items": 0,
+            "recipes": 0,
+            "harvest_loots": 0,
+            "version": sync_result["version"],
+            "fetch_seconds": sync_result["fetch_seconds"]
         }
         
-        if items:
-            await analysis_service.update_items_cache(
-                items=items or [],
-                recipes=recipes or [],
-                harvest_loots=harvest_loots or []
-            )
-            results["status"] = "success"
-            results["message"] = "CDN synchronisé avec succès"
-        else:
+        if sync_result["status"] == "error":
             results["status"] = "warning"
-            results["message"] = "Aucune donnée récupérée"
+            results["message"] = sync_result["message"]
+        else:
+            results.update(sync_result.get("source_counts", {}))
+            if "timings" in sync_result:
+                results["delta"] = sync_result["delta"]
+                results["cache_timings"] = sync_result["timings"]
+            results["status"] = sync_result["status"]
+            results["message"] = sync_result["message"]
         
         return results
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    finally:
-        await wakfu_cdn.close()
 
 @router.post("/import-json")
 async def import_json_data(
@@ -1,10 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.orm import Session, aliased
+from typing import List, Optional
 from pydantic import BaseModel, Field
 from datetime import datetime
+from collections import Counter
+import asyncio
+import base64
+import json
 
 from core.database import get_db
+from core.http_cache import make_etag, etag_matches, not_modified, set_etag
+from services.generations import ZONES
+from services.zone_levels import zone_levels, LevelFilterMode, MAX_LEVEL
 from models.build import Build
 from models.cache import FarmAnalysis
 # Zenith n'est plus utilisé - tout se fait via /search/build-from-text
@@ -24,6 +32,36 @@ class BuildCreateWithItems(BaseModel):
     build_name: str
     items_ids: List[int]
 
+class BuildSummary(BaseModel):
+    id: int
+    build_name: str
+    items_count: int
+    created_at: datetime
+
+class BuildListResponse(BaseModel):
+    builds: List[BuildSummary]
+    next_cursor: Optional[str] = None
+
+def _encode_cursor(build_id: int) -> str:
+    """
+    Curseur opaque: ID du dernier build de la page
+
+    Le created_at de ce build est relu en base plutôt que transporté dans le curseur:
+    une date reformatée ne se compare pas toujours à la valeur stockée (texte sous SQLite).
+    """
+    payload = json.dumps([build_id])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+def _decode_cursor(cursor: str) -> int:
+    try:
+        (build_id,) = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return int(build_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Curseur invalide")
+
+class BatchAnalyzeRequest(BaseModel):
+    build_ids: List[int] = Field(..., min_length=1, max_length=200)
+
 @router.post("/", response_model=BuildResponse)
 async def create_build(build_data: BuildCreateWithItems, db: Session = Depends(get_db)):
     """
@@ -40,13 +78,73 @@ async def create_build(build_data: BuildCreateWithItems, db: Session = Depends(g
     )
     
     db.add(db_build)
+    db.flush()
+    
+    # Index inverse item -> builds et contenu partagé (builds identiques), dans la même transaction
+    from services.build_items import build_items
+    from services.roadmaps import roadmap_service
+    build_items.add_build(db, db_build)
+    db_build.content_hash = roadmap_service.get_or_create_content(db, db_build.items_ids, db_build.id).content_hash
+    
     db.commit()
     db.refresh(db_build)
     
     return db_build
 
+@router.get("/", response_model=BuildListResponse)
+async def list_builds(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    name: Optional[str] = None,
+    name_prefix: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Liste les builds du plus récent au plus ancien (résumés, sans items ni roadmap)
+    
+    Pagination par curseur sur (created_at, id): passer next_cursor de la page
+    précédente. Le coût d'une page ne dépend pas de sa position.
+    
+    Args:
+        name: Nom exact du build (index build_name)
+        name_prefix: Début du nom du build
+    """
+    query = db.query(
+        Build.id,
+        Build.build_name,
+        func.json_array_length(Build.items_ids),
+        Build.created_at
+    )
+    
+    if name is not None:
+        query = query.filter(Build.build_name == name)
+    if name_prefix:
+        query = query.filter(Build.build_name.startswith(name_prefix, autoescape=True))
+    if cursor:
+        build_id = _decode_cursor(cursor)
+        cursor_build = aliased(Build)
+        cursor_created_at = select(cursor_build.created_at).where(cursor_build.id == build_id).scalar_subquery()
+        # (created_at, id) < position du curseur, comparé à la valeur stockée
+        query = query.filter(or_(
+            Build.created_at < cursor_created_at,
+            and_(Build.created_at == cursor_created_at, Build.id < build_id)
+        ))
+    
+    # Une ligne de plus pour savoir s'il existe une page suivante
+    rows = query.order_by(Build.created_at.desc(), Build.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    
+    return BuildListResponse(
+        builds=[
+            BuildSummary(id=build_id, build_name=build_name, items_count=items_count or 0, created_at=created_at)
+            for build_id, build_name, items_count, created_at in rows
+        ],
+        next_cursor=_encode_cursor(rows[-1][0]) if has_more else None
+    )
+
 @router.get("/{build_id}")
-async def get_build(build_id: int, db: Session = Depends(get_db)):
+async def get_build(build_id: int, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     """
     Récupère un build par son ID avec sa roadmap complète
     Retourne la même structure que /search/build-from-text
@@ -55,45 +153,47 @@ async def get_build(build_id: int, db: Session = Depends(get_db)):
     if not build:
         raise HTTPException(status_code=404, detail="Build non trouvé")
     
-    # Récupérer les détails des items depuis le cache
+    # Détails des items: une seule requête IN, en ne projetant que les champs utiles
     from models.cache import CachedItem
+    from routers.search import item_type_name, rarity_name
+    base_params = CachedItem.data_json["definition"]["item"]["baseParameters"]
+    rows = db.query(
+        CachedItem.wakfu_id,
+        CachedItem.data_json["title"]["fr"].as_string(),
+        CachedItem.data_json["definition"]["item"]["level"].as_integer(),
+        base_params["itemTypeId"].as_integer(),
+        base_params["rarity"].as_integer(),
+        CachedItem.obtention_type
+    ).filter(CachedItem.wakfu_id.in_(build.items_ids)).all() if build.items_ids else []
+    cached_items = {row[0]: row for row in rows}
+    
     items_found = []
     items_missing = []
     
     for item_id in build.items_ids:
-        cached_item = db.query(CachedItem).filter(CachedItem.wakfu_id == item_id).first()
+        cached_item = cached_items.get(item_id)
         if cached_item:
-            try:
-                item_data = cached_item.data_json
-                item_name = item_data.get('title', {}).get('fr', f'Item {item_id}') if isinstance(item_data, dict) else f'Item {item_id}'
-                
-                # Extraire les infos supplémentaires
-                from routers.search import get_item_type, get_item_rarity
-                level = item_data.get('definition', {}).get('item', {}).get('level') if isinstance(item_data, dict) else None
-                item_type = get_item_type(item_data) if isinstance(item_data, dict) else None
-                rarity = get_item_rarity(item_data) if isinstance(item_data, dict) else None
-                
-                items_found.append({
-                    'input_name': item_name,
-                    'found_item': {
-                        'wakfu_id': item_id,
-                        'name': item_name,
-                        'level': level,
-                        'item_type': item_type,
-                        'rarity': rarity,
-                        'match_score': 1.0,  # Score parfait car c'est un item exact du build
-                        'obtention_type': cached_item.obtention_type
-                    },
-                    'wakfu_id': item_id
-                })
-            except Exception as e:
-                items_missing.append(f'Item {item_id} (erreur de données)')
+            _, name, level, item_type_id, rarity_id, obtention_type = cached_item
+            item_name = name or f'Item {item_id}'
+            items_found.append({
+                'input_name': item_name,
+                'found_item': {
+                    'wakfu_id': item_id,
+                    'name': item_name,
+                    'level': level,
+                    'item_type': item_type_name(item_type_id),
+                    'rarity': rarity_name(rarity_id),
+                    'match_score': 1.0,  # Score parfait car c'est un item exact du build
+                    'obtention_type': obtention_type
+                },
+                'wakfu_id': item_id
+            })
         else:
             items_missing.append(f'Item {item_id} (non trouvé en cache)')
     
-    # Générer la roadmap avec le drop_manager
-    from services.drop_manager import drop_manager
-    roadmap = drop_manager.get_farm_roadmap(build.items_ids)
+    # Roadmap pré-calculée (recalculée en tâche de fond si les données ont changé)
+    from services.roadmaps import roadmap_service
+    roadmap = roadmap_service.get_build_roadmap(db, build, background_tasks)
     
     return {
         'build_id': build_id,
@@ -107,7 +207,17 @@ async def get_build(build_id: int, db: Session = Depends(get_db)):
     }
 
 @router.get("/{build_id}/roadmap")
-async def get_build_roadmap(build_id: int, collapsed: bool = True, db: Session = Depends(get_db)):
+async def get_build_roadmap(
+    build_id: int,
+    request: Request,
+    response: Response,
+    background_tasks: BackgroundTasks,
+    collapsed: bool = True,
+    player_level: Optional[int] = Query(None, ge=1, le=MAX_LEVEL),
+    level_tolerance: int = Query(10, ge=0, le=MAX_LEVEL),
+    level_filter: LevelFilterMode = "rank",
+    db: Session = Depends(get_db)
+):
     """
     Génère la roadmap de farm complète pour un build
     Indique quels monstres farmer, dans quelles zones, avec les taux de drop
@@ -115,15 +225,36 @@ async def get_build_roadmap(build_id: int, collapsed: bool = True, db: Session =
     Args:
         build_id: ID du build
         collapsed: Si True, retourne les zones avec monstres cachés par défaut
+        player_level: Niveau du joueur (zones et monstres annotés selon leur niveau)
+        level_tolerance: Écart de niveau accepté autour de player_level
+        level_filter: "rank" (hors tranche en dernier) ou "exclude" (hors tranche retirés)
+    
+    ETag dérivé du contenu du build, des générations des données (drops, zones, sources
+    de récolte) et de la révision des items du contenu: If-None-Match correspondant
+    -> 304 sans lire la roadmap.
     """
     build = db.query(Build).filter(Build.id == build_id).first()
     if not build:
         raise HTTPException(status_code=404, detail="Build non trouvé")
     
-    # Utiliser le drop_manager pour générer la roadmap optimisée
-    from services.drop_manager import drop_manager
+    from services.roadmaps import roadmap_service
+    
+    current = roadmap_service.current_generations(db)
+    stamp = roadmap_service.content_generations(db, build.content_hash, current)
+    etag = make_etag(
+        "roadmap", build.id, build.build_name, build.content_hash, collapsed,
+        player_level, level_tolerance, level_filter, sorted(stamp.items())
+    )
+    if etag_matches(request, etag):
+        return not_modified(etag)
     
-    roadmap = drop_manager.get_farm_roadmap(build.items_ids)
+    # Roadmap pré-calculée (recalculée en tâche de fond si les données ont changé)
+    roadmap = roadmap_service.get_build_roadmap(db, build, background_tasks, current)
+    if not roadmap["stale"]:
+        # Une roadmap périmée ne doit pas être revalidée sous l'ETag des données actuelles
+        set_etag(response, etag)
+    if player_level is not None:
+        roadmap = zone_levels.apply(db, roadmap, player_level, level_tolerance, level_filter, current[ZONES])
     roadmap["build_id"] = build_id
     roadmap["build_name"] = build.build_name
     roadmap["collapsed_by_default"] = collapsed
@@ -145,12 +276,17 @@ async def analyze_build_complete(build_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Build non trouvé")
     
     from services.analysis import analysis_service
+    from services.roadmaps import roadmap_service
     
     # Analyser le build et générer les données de farm
+    # (analyses partagées entre builds identiques, portées par le premier build du contenu)
+    owner_id = roadmap_service.analysis_owners(db, [build])[build_id]
     analysis_result = await analysis_service.analyze_build_for_farming(
-        build_id=build_id,
+        build_id=owner_id,
         items_ids=build.items_ids
     )
+    if "error" not in analysis_result:
+        analysis_result["build_id"] = build_id
     
     # Ajouter les données de drop des monstres
     from services.drop_manager import drop_manager
@@ -162,4 +298,70 @@ async def analyze_build_complete(build_id: int, db: Session = Depends(get_db)):
         "items_count": len(build.items_ids),
         "analysis": analysis_result,
         "drops_data": drops_data
-    }
\ No newline at end of file
+    }
+
+@router.post("/analyze-batch")
+async def analyze_builds_batch(request: BatchAnalyzeRequest, db: Session = Depends(get_db)):
+    """
+    Analyse complète de plusieurs builds (ex: bibliothèque d'un utilisateur)
+    
+    Les items de tous les builds sont dédoublonnés: items, analyses et drops sont
+    récupérés une seule fois pour l'ensemble, puis répartis par build.
+    """
+    build_ids = list(dict.fromkeys(request.build_ids))
+    builds = db.query(Build).filter(Build.id.in_(build_ids)).all()
+    builds_items = {build.id: build.items_ids for build in builds}
+    all_items = list(dict.fromkeys(item_id for items_ids in builds_items.values() for item_id in items_ids))
+    
+    from services.analysis import analysis_service
+    from services.drop_manager import drop_manager
+    from services.roadmaps import roadmap_service
+    
+    # Builds identiques: une seule analyse, portée par le premier build du contenu
+    owners = roadmap_service.analysis_owners(db, builds)
+    owners_items = {owners[build.id]: build.items_ids for build in builds}
+    
+    # Analyses et drops sont indépendants: récupérés en parallèle
+    analyses, drops_data = await asyncio.gather(
+        analysis_service.analyze_builds_for_farming(owners_items),
+        asyncio.to_thread(drop_manager.get_drops_for_items, all_items)
+    )
+    
+    results = {}
+    for build in builds:
+        results[build.id] = {
+            "build_id": build.id,
+            "build_name": build.build_name,
+            "items_count": len(build.items_ids),
+            "analysis": dict(analyses[owners[build.id]], build_id=build.id),
+            "drops_data": {item_id: drops_data[item_id] for item_id in dict.fromkeys(build.items_ids)}
+        }
+    
+    return {
+        "builds": results,
+        "missing_builds": [build_id for build_id in build_ids if build_id not in builds_items],
+        "summary": {
+            "builds": len(results),
+            "unique_items": len(all_items),
+            "distinct_contents": len(owners_items),
+            "recomputed": sum(analysis.get("recomputed", 0) for analysis in analyses.values()),
+            "reused": sum(analysis.get("reused", 0) for analysis in analyses.values())
+        }
+    }
+
+@router.get("/{build_id}/materials")
+async def get_build_materials(build_id: int, db: Session = Depends(get_db)):
+    """
+    Matériaux de base nécessaires pour crafter tous les items craftables du build
+    Les arbres de craft sont développés une fois par synchro CDN, pas par requête
+    """
+    build = db.query(Build).filter(Build.id == build_id).first()
+    if not build:
+        raise HTTPException(status_code=404, detail="Build non trouvé")
+    
+    from services.recipe_graph import recipe_graph
+    
+    materials = recipe_graph.get_base_materials(db, dict(Counter(build.items_ids)))
+    materials["build_id"] = build_id
+    materials["build_name"] = build.build_name
+    return materials
\ No newline at end of file
@@ -6,15 +6,34 @@ from core.database import get_db
 from services.wakfu_cdn import wakfu_cdn
 from models.cache import CachedItem
 from services.analysis import analysis_service
+from services.cdn_ingestion import cdn_ingestion
 
 router = APIRouter(prefix="/cdn", tags=["cdn"])
 
 @router.post("/sync")
-async def sync_cdn_data(background_tasks: BackgroundTasks):
-    """Lance la synchronisation des données CDN en arrière-plan"""
-    background_tasks.add_task(sync_wakfu_data)
+async def sync_cdn_data(background_tasks: BackgroundTasks, force: bool = False):
+    """
+    Lance la synchronisation des données CDN en arrière-plan
+    
+    Args:
+        force: Ré-analyse les items même si les fichiers CDN n'ont pas changé
+    """
+    background_tasks.add_task(sync_wakfu_data, force)
     return {"message": "Synchronisation CDN lancée en arrière-plan"}
 
+@router.post("/sync-drops")
+async def sync_cdn_drops(background_tasks: BackgroundTasks, force: bool = False):
+    """
+    Lance l'import des monstres, drops et zones depuis le CDN en arrière-plan
+    
+    Remplace le scraping de l'encyclopédie: la base de drops est remplie en quelques secondes.
+    
+    Args:
+        force: Ré-importe même si les fichiers CDN n'ont pas changé
+    """
+    background_tasks.add_task(sync_wakfu_drops, force)
+    return {"message": "Import des drops CDN lancé en arrière-plan"}
+
 @router.get("/version")
 async def get_cdn_version():
     """Récupère la version actuelle du CDN"""
@@ -39,28 +58,36 @@ async def get_cache_stats(db: Session = Depends(get_db)):
         "obtention_breakdown": obtention_counts
     }
 
-async def sync_wakfu_data():
+async def sync_wakfu_data(force: bool = False):
     """Fonction de synchronisation des données CDN"""
     try:
         print("Début synchronisation CDN Wakfu...")
         
-        # Récupère les données du CDN
-        items = await wakfu_cdn.get_items()
-        recipes = await wakfu_cdn.get_recipes()
-        harvest_loots = await wakfu_cdn.get_harvest_loots()
+        # Téléchargement (parallèle, miroir local) puis analyse et sauvegarde en BDD
+        result = await analysis_service.sync_items_from_cdn(force=force)
         
-        if not items:
-            print("Erreur: impossible de récupérer les items")
+        if result["status"] == "error":
+            print(f"Erreur: {result['message']}")
             return
         
-        print(f"Récupéré {len(items)} items du CDN")
+        print(f"Synchronisation CDN terminée ({result['version']}): {result['message']}")
+        if "delta" in result:
+            print(f"Delta: {result['delta']}")
         
-        # Analyse et sauvegarde en BDD
-        await analysis_service.update_items_cache(items, recipes, harvest_loots)
+    except Exception as e:
+        print(f"Erreur synchronisation CDN: {e}")
+
+async def sync_wakfu_drops(force: bool = False):
+    """Fonction d'import des monstres, drops et zones du CDN"""
+    try:
+        print("Début import des drops CDN...")
+        result = await cdn_ingestion.ingest_drops_from_cdn(force=force)
         
-        print("Synchronisation CDN terminée")
+        if result["status"] == "error":
+            print(f"Erreur: {result['message']}")
+            return
+        
+        print(f"Import des drops CDN terminé ({result['version']}): {result['message']}")
         
     except Exception as e:
-        print(f"Erreur synchronisation CDN: {e}")
-    finally:
-        await wakfu_cdn.close()
\ No newline at end of file
+        print(f"Erreur import drops CDN: {e}")
\ No newline at end of file
@@ -2,16 +2,19 @@
 Endpoints API pour gérer les données de drop des monstres
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from pydantic import BaseModel
 from datetime import datetime
 
 from core.database import get_db
+from core.http_cache import make_etag, etag_matches, not_modified, set_etag
 from models.cache import MonsterDrop, CachedMonster
 from models.zones import MonsterZone, Zone
 from services.drop_manager import drop_manager
+from services.generations import generations, DROPS, ZONES
+from services.zone_levels import zone_levels, LevelFilterMode, MAX_LEVEL
 
 router = APIRouter(prefix="/drops", tags=["drops"])
 
@@ -32,8 +35,16 @@ class FarmRoadmapRequest(BaseModel):
 
 
 @router.get("/item/{item_id}")
-async def get_item_drops(item_id: int, db: Session = Depends(get_db)):
-    """Récupère tous les monstres qui drop un item spécifique"""
+async def get_item_drops(item_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    """
+    Récupère tous les monstres qui drop un item spécifique
+    
+    ETag dérivé des générations des drops et des zones: If-None-Match correspondant -> 304
+    """
+    current = generations.get_all(db)
+    etag = make_etag("drops", item_id, current[DROPS], current[ZONES])
+    if etag_matches(request, etag):
+        return not_modified(etag)
     
     # Requête simple pour les drops
     drops = db.query(MonsterDrop)\
@@ -72,6 +83,7 @@ async def get_item_drops(item_id: int, db: Session = Depends(get_db)):
         }
         enriched_drops.append(drop_dict)
     
+    set_etag(response, etag)
     return enriched_drops
 
 @router.get("/monster/{monster_id}")
@@ -104,7 +116,14 @@ async def get_monster_drops(monster_id: int, db: Session = Depends(get_db)):
     }
 
 @router.post("/farm-roadmap")
-async def generate_farm_roadmap(request: FarmRoadmapRequest, collapsed: bool = True):
+async def generate_farm_roadmap(
+    request: FarmRoadmapRequest,
+    collapsed: bool = True,
+    player_level: Optional[int] = Query(None, ge=1, le=MAX_LEVEL),
+    level_tolerance: int = Query(10, ge=0, le=MAX_LEVEL),
+    level_filter: LevelFilterMode = "rank",
+    db: Session = Depends(get_db)
+):
     """
     Génère une roadmap de farm optimisée pour une liste d'items
     
@@ -116,11 +135,14 @@ async def generate_farm_roadmap(request: FarmRoadmapRequest, collapsed: bool = T
     Args:
         request: Liste des IDs d'items
         collapsed: Si True, retourne les zones avec monstres cachés par défaut
+        player_level: Niveau du joueur (zones et monstres annotés selon leur niveau)
+        level_tolerance: Écart de niveau accepté autour de player_level
+        level_filter: "rank" (hors tranche en dernier) ou "exclude" (hors tranche retirés)
     """
     if not request.item_ids:
         raise HTTPException(status_code=400, detail="La liste d'items est vide")
     
-    roadmap = drop_manager.get_farm_roadmap(request.item_ids)
+    roadmap = drop_manager.get_farm_roadmap(request.item_ids, db=db)
     
     if not roadmap.get('monsters'):
         raise HTTPException(
@@ -128,6 +150,8 @@ async def generate_farm_roadmap(request: FarmRoadmapRequest, collapsed: bool = T
             detail="Aucune donnée de drop trouvée pour ces items. Lancez d'abord un scraping."
         )
     
+    if player_level is not None:
+        roadmap = zone_levels.apply(db, roadmap, player_level, level_tolerance, level_filter)
     roadmap["collapsed_by_default"] = collapsed
     
     # Si collapsed est activé, marquer toutes les zones comme non-expandées
@@ -247,6 +271,9 @@ async def import_monster_drops(request: ImportDropsRequest, db: Session = Depend
                 results['errors'].append(f"Erreur monstre {monster_data.get('name', 'Unknown')}: {str(e)}")
                 continue
         
+        # Un commit par monstre: les générations sont incrémentées une fois à la fin
+        generations.bump_now(DROPS)
+        
         return {
             "message": "Import terminé",
             "results": results
@@ -437,6 +464,9 @@ async def import_json_file(request: JSONFileImportRequest, db: Session = Depends
                 results['errors'].append(f"Erreur inattendue monstre {monster_data.get('name', 'Unknown')}: {str(e)}")
                 continue
         
+        # Un commit par monstre: les générations sont incrémentées une fois à la fin
+        generations.bump_now(DROPS)
+        
         # Résultat final
         success_rate = (results['monsters_processed'] - len(results['errors'])) / max(results['monsters_processed'], 1) * 100
         
@@ -467,6 +497,7 @@ async def clear_drop_data(db: Session = Depends(get_db)):
         db.query(MonsterDrop).delete()
         # Supprimer tous les monstres cachés
         db.query(CachedMonster).delete()
+        generations.bump(db, DROPS)
         db.commit()
         
         return {"message": "Toutes les données de drop ont été supprimées"}
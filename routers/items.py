@@ -1,10 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import List, Optional
 from pydantic import BaseModel
+from datetime import datetime
 
 from core.database import get_db
+from core.http_cache import make_etag, etag_matches, not_modified, set_etag
 from models.cache import CachedItem
+from models.recipes import RecipeIngredient
+from services.recipe_graph import recipe_graph
+from services.harvest_sources import harvest_sources
+from services.build_items import build_items
 
 router = APIRouter(prefix="/items", tags=["items"])
 
@@ -13,14 +19,48 @@ class ItemResponse(BaseModel):
     wakfu_id: int
     data_json: dict
     obtention_type: Optional[str]
-    last_updated: str
+    last_updated: Optional[datetime]
     
     class Config:
         from_attributes = True
 
+class ItemIdsRequest(BaseModel):
+    item_ids: List[int]
+
+@router.get("/popular")
+async def get_popular_items(limit: int = Query(20, ge=1, le=200), db: Session = Depends(get_db)):
+    """Items les plus utilisés dans les builds enregistrés"""
+    popular = build_items.item_popularity(db, limit=limit)
+    
+    item_ids = [entry["item_id"] for entry in popular]
+    names = dict(
+        db.query(CachedItem.wakfu_id, CachedItem.data_json["title"]["fr"].as_string()).filter(
+            CachedItem.wakfu_id.in_(item_ids)
+        ).all()
+    ) if item_ids else {}
+    
+    for entry in popular:
+        entry["name"] = names.get(entry["item_id"]) or f"Item {entry['item_id']}"
+    return popular
+
 @router.get("/{item_id}", response_model=ItemResponse)
-async def get_item(item_id: int, db: Session = Depends(get_db)):
-    """Récupère les détails d'un item"""
+async def get_item(item_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    """
+    Récupère les détails d'un item
+    
+    ETag dérivé de l'empreinte de l'item (content_hash, mise à jour à chaque synchro
+    CDN qui le modifie): If-None-Match correspondant -> 304 sans charger l'item.
+    """
+    version = db.query(CachedItem.content_hash, CachedItem.last_updated).filter(
+        CachedItem.wakfu_id == item_id
+    ).first()
+    if not version:
+        raise HTTPException(status_code=404, detail="Item non trouvé")
+    
+    etag = make_etag("item", item_id, version.content_hash or version.last_updated)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    
     item = db.query(CachedItem).filter(
         CachedItem.wakfu_id == item_id
     ).first()
@@ -28,8 +68,39 @@ async def get_item(item_id: int, db: Session = Depends(get_db)):
     if not item:
         raise HTTPException(status_code=404, detail="Item non trouvé")
     
+    set_etag(response, etag)
     return item
 
+@router.post("/obtention")
+async def get_items_obtention(request: ItemIdsRequest, db: Session = Depends(get_db)):
+    """
+    Infos d'obtention de plusieurs items (ex: tout un build) en requêtes groupées,
+    avec les sources de récolte des items récoltables
+    """
+    item_ids = list(dict.fromkeys(request.item_ids))
+    obtention_types = dict(
+        db.query(CachedItem.wakfu_id, CachedItem.obtention_type).filter(
+            CachedItem.wakfu_id.in_(item_ids)
+        ).all()
+    ) if item_ids else {}
+    
+    harvestable = [item_id for item_id, obtention_type in obtention_types.items() if obtention_type == "harvest"]
+    sources = harvest_sources.get_sources_for_items(db, harvestable)
+    
+    items = {}
+    for item_id in item_ids:
+        if item_id not in obtention_types:
+            continue
+        items[item_id] = {
+            "obtention_type": obtention_types[item_id],
+            "harvest_sources": sources.get(item_id, [])
+        }
+    
+    return {
+        "items": items,
+        "missing": [item_id for item_id in item_ids if item_id not in obtention_types]
+    }
+
 @router.get("/{item_id}/obtention")
 async def get_item_obtention(item_id: int, db: Session = Depends(get_db)):
     """Récupère les infos d'obtention d'un item"""
@@ -55,7 +126,8 @@ async def get_item_obtention(item_id: int, db: Session = Depends(get_db)):
     elif item.obtention_type == "harvest":
         obtention_info["details"] = {
             "message": "Cet item se récolte",
-            "action": "Chercher les zones de récolte"
+            "action": "Chercher les zones de récolte",
+            "sources": harvest_sources.get_sources_for_items(db, [item_id]).get(item_id, [])
         }
     elif item.obtention_type == "shop":
         obtention_info["details"] = {
@@ -68,4 +140,47 @@ async def get_item_obtention(item_id: int, db: Session = Depends(get_db)):
             "action": "Vérifier en jeu"
         }
     
-    return obtention_info
\ No newline at end of file
+    return obtention_info
+
+@router.get("/{item_id}/craft-tree")
+async def get_item_craft_tree(item_id: int, quantity: int = 1, db: Session = Depends(get_db)):
+    """
+    Arbre de craft d'un item: ingrédients directs de sa recette et
+    matériaux de base totaux (arbre développé lors de la synchro CDN)
+    """
+    if quantity < 1:
+        raise HTTPException(status_code=400, detail="La quantité doit être positive")
+    
+    ingredients = db.query(RecipeIngredient).filter(
+        RecipeIngredient.result_item_id == item_id
+    ).order_by(RecipeIngredient.recipe_id).all()
+    
+    if not ingredients:
+        raise HTTPException(status_code=404, detail="Aucune recette pour cet item")
+    
+    # Même recette que celle retenue pour l'arbre développé (plus petit ID)
+    recipe_id = ingredients[0].recipe_id
+    materials = recipe_graph.get_base_materials(db, {item_id: quantity})
+    
+    return {
+        "item_id": item_id,
+        "quantity": quantity,
+        "recipe_id": recipe_id,
+        "result_quantity": ingredients[0].result_quantity,
+        "ingredients": [
+            {"item_id": ingredient.ingredient_item_id, "quantity": ingredient.quantity}
+            for ingredient in ingredients if ingredient.recipe_id == recipe_id
+        ],
+        "depth": materials["craftable_items"][0]["depth"] if materials["craftable_items"] else 0,
+        "base_materials": materials["base_materials"]
+    }
+
+@router.get("/{item_id}/builds")
+async def get_item_builds(item_id: int, limit: int = Query(50, ge=1, le=500), db: Session = Depends(get_db)):
+    """Builds enregistrés qui utilisent cet item (les plus récents d'abord)"""
+    builds = build_items.builds_using_items(db, [item_id], limit=limit)
+    return {
+        "item_id": item_id,
+        "builds": builds,
+        "count": len(builds)
+    }
\ No newline at end of file
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
 from typing import List, Optional
@@ -11,6 +11,43 @@ from models.cache import CachedItem
 
 router = APIRouter(prefix="/search", tags=["search"])
 
+# Noms des types d'items (itemTypeId des baseParameters, à compléter)
+ITEM_TYPE_NAMES = {
+    134: "Coiffe",
+    133: "Casque",
+    136: "Cape",
+    138: "Plastron",
+    119: "Anneau",
+    120: "Amulette",
+    103: "Bottes",
+    132: "Ceinture",
+    646: "Épaulettes"
+}
+
+# Noms des raretés (rarity des baseParameters)
+RARITY_NAMES = {
+    0: "Commun",
+    1: "Inhabituel",
+    2: "Rare",
+    3: "Mythique",
+    4: "Légendaire",
+    5: "Relique",
+    6: "Épique",
+    7: "Souvenir"
+}
+
+def item_type_name(item_type_id: Optional[int]) -> Optional[str]:
+    """Nom d'un type d'item à partir de son itemTypeId"""
+    if not item_type_id:
+        return None
+    return ITEM_TYPE_NAMES.get(item_type_id, f"Type {item_type_id}")
+
+def rarity_name(rarity_id: Optional[int]) -> Optional[str]:
+    """Nom d'une rareté à partir de son ID"""
+    if rarity_id is None:
+        return None
+    return RARITY_NAMES.get(rarity_id, f"Rareté {rarity_id}")
+
 class ItemSearchResult(BaseModel):
     wakfu_id: int
     name: str
@@ -85,7 +122,11 @@ async def search_items(request: ItemSearchRequest, db: Session = Depends(get_db)
     return results[:request.limit]
 
 @router.post("/build-from-text")
-async def create_build_from_text(request: BuildFromTextRequest, db: Session = Depends(get_db)):
+async def create_build_from_text(
+    request: BuildFromTextRequest,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
     """
     Crée un build à partir d'une liste d'items en texte
     Exemple: "Épée Iop, Cape du Feu, Anneau PA"
@@ -135,9 +176,9 @@ async def create_build_from_text(request: BuildFromTextRequest, db: Session = De
     # Créer le build avec les items trouvés
     items_ids = [item['wakfu_id'] for item in found_items]
     
-    # Utiliser le drop_manager pour générer la roadmap
-    from services.drop_manager import drop_manager
-    roadmap = drop_manager.get_farm_roadmap(items_ids)
+    # Roadmap partagée par contenu: un build déjà collé par d'autres n'est pas recalculé
+    from services.roadmaps import roadmap_service
+    roadmap = roadmap_service.get_items_roadmap(db, items_ids, background_tasks)
     
     return {
         'build_name': request.build_name or f"Build depuis texte ({len(found_items)} items)",
@@ -265,19 +306,7 @@ def get_item_type(item_data: dict) -> Optional[str]:
                 base_params = item_info.get('baseParameters', {})
                 item_type_id = base_params.get('itemTypeId')
                 if item_type_id:
-                    # Mapper les IDs de type aux noms (à compléter)
-                    type_map = {
-                        134: "Coiffe",
-                        133: "Casque",
-                        136: "Cape",
-                        138: "Plastron",
-                        119: "Anneau",
-                        120: "Amulette",
-                        103: "Bottes",
-                        132: "Ceinture",
-                        646: "Épaulettes"
-                    }
-                    return type_map.get(item_type_id, f"Type {item_type_id}")
+                    return item_type_name(item_type_id)
         
         # Autres possibilités
         return item_data.get('itemType') or item_data.get('category')
@@ -291,17 +320,7 @@ def get_item_rarity(item_data: dict) -> Optional[str]:
         base_params = item_data.get('definition', {}).get('item', {}).get('baseParameters', {})
         rarity_id = base_params.get('rarity')
         if rarity_id is not None:
-            rarity_map = {
-                0: "Commun",
-                1: "Inhabituel",
-                2: "Rare",
-                3: "Mythique",
-                4: "Légendaire",
-                5: "Relique",
-                6: "Épique",
-                7: "Souvenir"
-            }
-            return rarity_map.get(rarity_id, f"Rareté {rarity_id}")
+            return rarity_name(rarity_id)
         return None
     except:
         return None
\ No newline at end of file
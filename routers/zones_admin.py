@@ -1,11 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, UploadFile, File
 from sqlalchemy.orm import Session
-from sqlalchemy import text
-from typing import List, Optional
-from pydantic import BaseModel
+from sqlalchemy import func
+from typing import Dict, List, Optional
+from pydantic import BaseModel, Field
+import csv
+import io
 
-from core.database import get_db
+from core.database import get_db, upsert_insert
 from models.zones import Zone, MonsterZone
+from models.cache import CachedMonster, MonsterDrop
+from services.generations import generations, ZONES
+from services.monster_catalog import monster_catalog
 
 router = APIRouter(prefix="/admin/zones", tags=["zones-admin"])
 
@@ -36,25 +41,47 @@ class MonsterZoneCreate(BaseModel):
 class ZoneDetailResponse(ZoneResponse):
     monsters: List[MonsterInfo] = []
 
+class MonsterZoneAssignment(BaseModel):
+    zone_id: int
+    monster_id: int
+    spawn_frequency: Optional[str] = None
+    notes: Optional[str] = None
+
+class BulkMonsterZoneRequest(BaseModel):
+    assignments: List[MonsterZoneAssignment] = Field(..., min_length=1, max_length=5000)
+
+# Nombre maximum de lignes d'un import CSV (comme BulkMonsterZoneRequest)
+BULK_MAX_ROWS = 5000
+
+# Nombre d'associations insérées par requête
+BULK_CHUNK_SIZE = 1000
+
 # Endpoints pour les Zones
 @router.get("/zones", response_model=List[ZoneResponse])
 async def list_zones(db: Session = Depends(get_db)):
-    """Liste toutes les zones avec le nombre de monstres"""
-    zones = db.query(Zone).all()
-    
-    result = []
-    for zone in zones:
-        monster_count = db.query(MonsterZone).filter(MonsterZone.zone_id == zone.id).count()
-        result.append(ZoneResponse(
-            id=zone.id,
-            name=zone.name,
-            description=zone.description,
-            min_level=zone.min_level,
-            max_level=zone.max_level,
-            monster_count=monster_count
-        ))
-    
-    return result
+    """Liste toutes les zones avec le nombre de monstres (une seule requête)"""
+    rows = db.query(
+        Zone.id,
+        Zone.name,
+        Zone.description,
+        Zone.min_level,
+        Zone.max_level,
+        func.count(MonsterZone.id).label("monster_count")
+    ).outerjoin(
+        MonsterZone, MonsterZone.zone_id == Zone.id
+    ).group_by(Zone.id).order_by(Zone.id).all()
+    
+    return [
+        ZoneResponse(
+            id=row.id,
+            name=row.name,
+            description=row.description,
+            min_level=row.min_level,
+            max_level=row.max_level,
+            monster_count=row.monster_count
+        )
+        for row in rows
+    ]
 
 @router.post("/zones", response_model=ZoneResponse)
 async def create_zone(zone_data: ZoneCreate, db: Session = Depends(get_db)):
@@ -72,6 +99,7 @@ async def create_zone(zone_data: ZoneCreate, db: Session = Depends(get_db)):
     )
     
     db.add(zone)
+    generations.bump(db, ZONES)
     db.commit()
     db.refresh(zone)
     
@@ -91,25 +119,35 @@ async def get_zone_detail(zone_id: int, db: Session = Depends(get_db)):
     if not zone:
         raise HTTPException(status_code=404, detail="Zone introuvable")
     
-    # Récupérer les monstres avec leurs noms depuis monster_drops
-    monster_zones = db.query(MonsterZone).filter(MonsterZone.zone_id == zone_id).all()
-    
-    monsters = []
-    for mz in monster_zones:
-        # Récupérer le nom du monstre depuis monster_drops
-        monster_name_result = db.execute(
-            text("SELECT DISTINCT monster_name FROM monster_drops WHERE monster_id = :monster_id LIMIT 1"),
-            {"monster_id": mz.monster_id}
-        ).fetchone()
-        
-        monster_name = monster_name_result[0] if monster_name_result else f"Monstre {mz.monster_id}"
-        
-        monsters.append(MonsterInfo(
-            monster_id=mz.monster_id,
-            monster_name=monster_name,
-            spawn_frequency=mz.spawn_frequency,
-            notes=mz.notes
-        ))
+    # Monstres et noms en une requête: cached_monsters, sinon monster_drops (index monster_id)
+    zone_monster_ids = db.query(MonsterZone.monster_id).filter(MonsterZone.zone_id == zone_id)
+    drop_names = db.query(
+        MonsterDrop.monster_id,
+        func.min(MonsterDrop.monster_name).label("monster_name")
+    ).filter(
+        MonsterDrop.monster_id.in_(zone_monster_ids.scalar_subquery())
+    ).group_by(MonsterDrop.monster_id).subquery()
+    
+    rows = db.query(
+        MonsterZone.monster_id,
+        MonsterZone.spawn_frequency,
+        MonsterZone.notes,
+        func.coalesce(CachedMonster.name, drop_names.c.monster_name).label("monster_name")
+    ).outerjoin(
+        CachedMonster, CachedMonster.wakfu_id == MonsterZone.monster_id
+    ).outerjoin(
+        drop_names, drop_names.c.monster_id == MonsterZone.monster_id
+    ).filter(MonsterZone.zone_id == zone_id).order_by(MonsterZone.id).all()
+    
+    monsters = [
+        MonsterInfo(
+            monster_id=row.monster_id,
+            monster_name=row.monster_name or f"Monstre {row.monster_id}",
+            spawn_frequency=row.spawn_frequency,
+            notes=row.notes
+        )
+        for row in rows
+    ]
     
     return ZoneDetailResponse(
         id=zone.id,
@@ -129,6 +167,7 @@ async def delete_zone(zone_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Zone introuvable")
     
     db.delete(zone)
+    generations.bump(db, ZONES)
     db.commit()
     
     return {"message": f"Zone '{zone.name}' supprimée"}
@@ -146,13 +185,12 @@ async def add_monster_to_zone(
     if not zone:
         raise HTTPException(status_code=404, detail="Zone introuvable")
     
-    # Vérifier que le monstre existe dans monster_drops
-    monster_exists = db.execute(
-        text("SELECT COUNT(*) FROM monster_drops WHERE monster_id = :monster_id"),
-        {"monster_id": monster_data.monster_id}
-    ).scalar()
+    # Vérifier que le monstre existe dans le catalogue (même source que la recherche)
+    monster_exists = db.query(CachedMonster.id).filter(
+        CachedMonster.wakfu_id == monster_data.monster_id
+    ).first() is not None
     
-    if monster_exists == 0:
+    if not monster_exists:
         raise HTTPException(status_code=404, detail=f"Monstre ID {monster_data.monster_id} introuvable")
     
     # Vérifier si l'association existe déjà
@@ -173,6 +211,7 @@ async def add_monster_to_zone(
     )
     
     db.add(monster_zone)
+    generations.bump(db, ZONES)
     db.commit()
     
     return {"message": "Monstre ajouté à la zone"}
@@ -189,27 +228,147 @@ async def remove_monster_from_zone(zone_id: int, monster_id: int, db: Session =
         raise HTTPException(status_code=404, detail="Association monstre/zone introuvable")
     
     db.delete(monster_zone)
+    generations.bump(db, ZONES)
     db.commit()
     
     return {"message": "Monstre retiré de la zone"}
 
-# Utilitaires
-@router.get("/monsters/search")
-async def search_monsters(q: Optional[str] = None, limit: int = 20, db: Session = Depends(get_db)):
-    """Recherche des monstres pour l'interface admin"""
-    query = "SELECT DISTINCT monster_id, monster_name FROM monster_drops"
-    params = {}
+def _assign_monsters_bulk(db: Session, rows: List[Dict]) -> Dict:
+    """
+    Associe des monstres à des zones en une transaction, avec validation ensembliste
     
-    if q:
-        query += " WHERE monster_name ILIKE :search"
-        params["search"] = f"%{q}%"
+    Args:
+        rows: Lignes {zone_id, monster_id, spawn_frequency, notes} (zone_id/monster_id
+              à None pour une ligne illisible, avec "error" renseigné)
     
-    query += " ORDER BY monster_name LIMIT :limit"
-    params["limit"] = limit
+    Returns:
+        Résultat par ligne (created, already_assigned, duplicate, zone_not_found,
+        monster_not_found, invalid) et compteurs
+    """
+    results = [
+        {"row": index, "zone_id": row.get("zone_id"), "monster_id": row.get("monster_id"), "status": None}
+        for index, row in enumerate(rows, start=1)
+    ]
     
-    results = db.execute(text(query), params).fetchall()
+    valid = []
+    for result, row in zip(results, rows):
+        if result["zone_id"] is None or result["monster_id"] is None:
+            result.update(status="invalid", detail=row.get("error", "zone_id et monster_id requis"))
+        else:
+            valid.append((result, row))
     
-    return [
-        {"monster_id": row[0], "monster_name": row[1]} 
-        for row in results
-    ]
\ No newline at end of file
+    # Validation ensembliste: une requête pour les zones, une pour les monstres
+    zone_ids = {row["zone_id"] for _, row in valid}
+    monster_ids = {row["monster_id"] for _, row in valid}
+    known_zones = {
+        zone_id for (zone_id,) in db.query(Zone.id).filter(Zone.id.in_(zone_ids)).all()
+    } if zone_ids else set()
+    known_monsters = {
+        monster_id for (monster_id,) in db.query(CachedMonster.wakfu_id).filter(
+            CachedMonster.wakfu_id.in_(monster_ids)
+        ).all()
+    } if monster_ids else set()
+    
+    to_insert: Dict[tuple, Dict] = {}
+    pending: Dict[tuple, Dict] = {}
+    for result, row in valid:
+        key = (row["zone_id"], row["monster_id"])
+        if row["zone_id"] not in known_zones:
+            result["status"] = "zone_not_found"
+        elif row["monster_id"] not in known_monsters:
+            result["status"] = "monster_not_found"
+        elif key in to_insert:
+            result["status"] = "duplicate"
+        else:
+            to_insert[key] = {
+                "zone_id": row["zone_id"],
+                "monster_id": row["monster_id"],
+                "spawn_frequency": row.get("spawn_frequency"),
+                "notes": row.get("notes")
+            }
+            pending[key] = result
+    
+    # Les associations déjà présentes sont ignorées par la base (ON CONFLICT DO NOTHING)
+    created = set()
+    values = list(to_insert.values())
+    for i in range(0, len(values), BULK_CHUNK_SIZE):
+        stmt = upsert_insert(MonsterZone.__table__).values(values[i:i + BULK_CHUNK_SIZE])
+        stmt = stmt.on_conflict_do_nothing(
+            index_elements=[MonsterZone.zone_id, MonsterZone.monster_id]
+        ).returning(MonsterZone.zone_id, MonsterZone.monster_id)
+        created.update(tuple(key) for key in db.execute(stmt).all())
+    
+    for key, result in pending.items():
+        result["status"] = "created" if key in created else "already_assigned"
+    
+    if created:
+        generations.bump(db, ZONES)
+    db.commit()
+    
+    summary = {"total": len(results)}
+    for result in results:
+        summary[result["status"]] = summary.get(result["status"], 0) + 1
+    
+    return {"summary": summary, "results": results}
+
+def _parse_assignments_csv(content: bytes) -> List[Dict]:
+    """Lignes CSV (en-tête: zone_id,monster_id[,spawn_frequency][,notes]) -> lignes d'association"""
+    try:
+        reader = csv.DictReader(io.StringIO(content.decode("utf-8-sig")))
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="Fichier CSV non UTF-8")
+    
+    if not reader.fieldnames or not {"zone_id", "monster_id"} <= {name.strip() for name in reader.fieldnames}:
+        raise HTTPException(status_code=400, detail="En-tête CSV attendu: zone_id,monster_id[,spawn_frequency][,notes]")
+    
+    rows = []
+    for line in reader:
+        # Champs au-delà de l'en-tête: regroupés par DictReader sous la clé None
+        extra = line.pop(None, None)
+        line = {key.strip(): (value or "").strip() for key, value in line.items()}
+        row = {"spawn_frequency": line.get("spawn_frequency") or None, "notes": line.get("notes") or None}
+        try:
+            row["zone_id"] = int(line["zone_id"])
+            row["monster_id"] = int(line["monster_id"])
+        except ValueError:
+            row.update(zone_id=None, monster_id=None, error=f"IDs invalides: {line['zone_id']!r}, {line['monster_id']!r}")
+        if extra:
+            row.update(zone_id=None, monster_id=None, error=f"{len(extra)} champ(s) de plus que l'en-tête")
+        rows.append(row)
+        if len(rows) > BULK_MAX_ROWS:
+            raise HTTPException(status_code=400, detail=f"Maximum {BULK_MAX_ROWS} lignes par import")
+    
+    if not rows:
+        raise HTTPException(status_code=400, detail="Fichier CSV vide")
+    return rows
+
+@router.post("/monster-zones/bulk")
+async def assign_monsters_bulk(request: BulkMonsterZoneRequest, db: Session = Depends(get_db)):
+    """
+    Associe de nombreux monstres à des zones en une requête
+    
+    Les zones et monstres sont validés en deux requêtes, les associations insérées
+    par paquets (les associations existantes sont ignorées), le tout en une transaction.
+    Retourne le statut de chaque ligne.
+    """
+    return _assign_monsters_bulk(db, [assignment.model_dump() for assignment in request.assignments])
+
+@router.post("/monster-zones/bulk-csv")
+async def assign_monsters_bulk_csv(file: UploadFile = File(...), db: Session = Depends(get_db)):
+    """
+    Comme /monster-zones/bulk, depuis un fichier CSV
+    
+    En-tête: zone_id,monster_id[,spawn_frequency][,notes]
+    Les lignes aux IDs illisibles sont rapportées comme invalid.
+    """
+    return _assign_monsters_bulk(db, _parse_assignments_csv(await file.read()))
+
+# Utilitaires
+@router.get("/monsters/search")
+async def search_monsters(
+    q: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """Recherche des monstres pour l'interface admin (catalogue cached_monsters indexé en mémoire)"""
+    return monster_catalog.search(db, q, limit)
\ No newline at end of file
@@ -1,119 +1,500 @@
-from typing import List, Dict, Optional
+from typing import Iterable, Iterator, List, Dict, Optional, Set, Tuple
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+import asyncio
+import hashlib
+import json
+import os
+import time
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from core.database import SessionLocal
+from core.config import settings
+from core.database import SessionLocal, upsert_insert
 from models.cache import CachedItem, FarmAnalysis
-from services.wakfu_cdn import wakfu_cdn
+from services.wakfu_cdn import wakfu_cdn, SYNC_DATA_TYPES
+from services.recipe_graph import recipe_graph
+from services.harvest_sources import harvest_sources
+from services.generations import generations, ITEMS
+from services.roadmaps import roadmap_service
+
+# Périmètre de synchro du cache d'items dans l'état du miroir CDN
+ITEMS_SYNC_SCOPE = "items_cache"
+
+# Nombre d'items upsertés (et commités) par requête lors de la synchro CDN
+ITEMS_CACHE_CHUNK_SIZE = 1000
+
+def _rate(count: int, seconds: float) -> float:
+    """Débit en lignes/s (0 si durée nulle)"""
+    return count / seconds if seconds > 0 else 0.0
+
+def item_fingerprint(item: Dict, obtention_type: str) -> str:
+    """
+    Empreinte d'un item du CDN (JSON canonique + type d'obtention)
+    
+    Le type d'obtention est inclus car il dépend aussi des recettes et des loots:
+    un item peut changer de type sans que son propre JSON change.
+    """
+    payload = json.dumps([item, obtention_type], sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+# Index d'obtention du processus courant (installé une fois par processus du pool)
+_worker_obtention_index: Optional[Dict[str, Set[int]]] = None
+
+def _init_classify_worker(obtention_index: Dict[str, Set[int]]):
+    global _worker_obtention_index
+    _worker_obtention_index = obtention_index
+
+def _classify_partition(
+    items: List[Dict],
+    obtention_index: Optional[Dict[str, Set[int]]] = None
+) -> List[Tuple[Optional[int], Optional[str], Optional[str]]]:
+    """
+    Classe un paquet d'items et calcule leurs empreintes (exécuté dans le pool)
+    
+    Args:
+        obtention_index: Index de la synchro (pool de threads); sinon celui installé
+                         dans le processus worker
+    
+    Returns:
+        (wakfu_id, type d'obtention, empreinte) par item, dans l'ordre du paquet
+        (wakfu_id None pour les entrées invalides)
+    """
+    if obtention_index is None:
+        obtention_index = _worker_obtention_index
+    results = []
+    for item in items:
+        item_id = item.get("definition", {}).get("item", {}).get("id")
+        if not item_id:
+            results.append((None, None, None))
+            continue
+        obtention_type = wakfu_cdn.classify_item_obtention(item, obtention_index)
+        results.append((item_id, obtention_type, item_fingerprint(item, obtention_type)))
+    return results
+
+def _partitions(items: Iterable[Dict], size: int) -> Iterator[List[Dict]]:
+    """Découpe un flux d'items en paquets de taille fixe"""
+    partition = []
+    for item in items:
+        partition.append(item)
+        if len(partition) >= size:
+            yield partition
+            partition = []
+    if partition:
+        yield partition
+
+def _counting(entries: Iterable[Dict], counts: Dict[str, int], key: str) -> Iterator[Dict]:
+    """Parcourt des entrées (éventuellement lues en flux) en les comptant au passage"""
+    for entry in entries:
+        counts[key] += 1
+        yield entry
 
 class AnalysisService:
-    def __init__(self):
-        pass
+    async def sync_items_from_cdn(self, force: bool = False) -> Dict:
+        """
+        Synchronise le cache d'items depuis le CDN (ou le miroir local hors-ligne)
+        
+        Les fichiers déjà présents dans le miroir ne sont pas re-téléchargés (requêtes
+        conditionnelles), et si leurs empreintes sont celles de la dernière analyse
+        réussie, l'analyse est sautée.
+        
+        Args:
+            force: Ré-analyse même si les données n'ont pas changé
+            
+        Returns:
+            Résumé: status ("success", "up_to_date" ou "error"), version, timings
+        """
+        version = await wakfu_cdn.get_current_version()
+        data, timings = await wakfu_cdn.fetch_many(SYNC_DATA_TYPES, version=version)
+        result = {"version": version, "fetch_seconds": timings}
+        
+        if not data["items"]:
+            result.update(status="error", message="Impossible de récupérer les items")
+            return result
+        
+        fingerprints = wakfu_cdn.fingerprints(data)
+        if not force and wakfu_cdn.mirror.is_synced(ITEMS_SYNC_SCOPE, fingerprints) and self._has_cached_items():
+            print(f"Données CDN {version} inchangées depuis la dernière synchro, analyse ignorée")
+            result.update(status="up_to_date", message="Données CDN déjà à jour")
+            return result
+        
+        cache_stats = await self.update_items_cache(
+            items=data["items"],
+            recipes=data["recipes"] or [],
+            harvest_loots=data["harvestLoots"] or []
+        )
+        changed_ids = cache_stats.pop("changed_ids", set())
+        result.update(cache_stats)
+        
+        if "error" not in cache_stats:
+            # Index dérivés, reconstruits une fois par synchro (hors de la boucle d'événements)
+            result["recipe_graph"] = await asyncio.to_thread(
+                recipe_graph.ingest, data["recipes"] or [], data["recipeIngredients"] or []
+            )
+            result["harvest_sources"] = await asyncio.to_thread(harvest_sources.ingest, data["harvestLoots"] or [])
+            for index_stats in (result["recipe_graph"], result["harvest_sources"]):
+                if "error" in index_stats:
+                    cache_stats["error"] = index_stats["error"]
+        
+        # Une seule invalidation, après les index dérivés, et seulement si des items ont changé
+        # (les paquets déjà commités restent visibles même en cas d'erreur ultérieure):
+        # seules les roadmaps des contenus contenant ces items sont périmées
+        if changed_ids:
+            await asyncio.to_thread(generations.bump_now, ITEMS)
+            result["invalidated_builds"] = await asyncio.to_thread(roadmap_service.invalidate_items, changed_ids)
+        
+        if "error" in cache_stats:
+            result.update(status="error", message=cache_stats["error"])
+        else:
+            wakfu_cdn.mirror.mark_synced(ITEMS_SYNC_SCOPE, fingerprints)
+            result.update(status="success", message="CDN synchronisé avec succès")
+        return result
     
-    async def update_items_cache(self, items: List[Dict], recipes: List[Dict], harvest_loots: List[Dict]):
-        """Met à jour le cache des items avec analyse d'obtention"""
+    def _has_cached_items(self) -> bool:
         db = SessionLocal()
         try:
-            print(f"Analyse de {len(items)} items...")
-            
-            for item in items:
-                item_data = item.get("definition", {}).get("item", {})
-                item_id = item_data.get("id")
-                
-                if not item_id:
-                    continue
-                
-                # Analyse du type d'obtention
-                obtention_type = wakfu_cdn.analyze_item_obtention(item, recipes, harvest_loots)
-                
-                # Vérifier si l'item existe déjà
-                existing_item = db.query(CachedItem).filter(
-                    CachedItem.wakfu_id == item_id
-                ).first()
-                
-                if existing_item:
-                    # Mettre à jour
-                    existing_item.data_json = item
-                    existing_item.obtention_type = obtention_type
-                else:
-                    # Créer nouveau
-                    new_item = CachedItem(
-                        wakfu_id=item_id,
-                        data_json=item,
-                        obtention_type=obtention_type
-                    )
-                    db.add(new_item)
+            return db.query(CachedItem.id).first() is not None
+        finally:
+            db.close()
+    
+    async def update_items_cache(self, items: Iterable[Dict], recipes: Iterable[Dict], harvest_loots: Iterable[Dict]) -> Dict:
+        """
+        Met à jour le cache des items avec analyse d'obtention (synchro différentielle)
+        
+        Les entrées peuvent être des listes ou des itérables paresseux (JSONArrayFile):
+        elles ne sont parcourues qu'une fois. Chaque item est comparé à l'empreinte
+        stockée (content_hash): seuls les items nouveaux ou modifiés sont upsertés,
+        par paquets de ITEMS_CACHE_CHUNK_SIZE avec un commit par paquet, et les items
+        absents du CDN sont supprimés.
+        
+        Rien ne bloque la boucle d'événements: la lecture des fichiers et les accès
+        base passent par un thread, la classification et les empreintes sont
+        réparties par paquets sur un pool de processus (settings.analysis_workers).
+        
+        Returns:
+            Statistiques de la synchro (delta, items écrits, paquets, workers, temps par étape);
+            changed_items / changed_ids: nombre et wakfu_id des items insérés, modifiés ou
+            supprimés (invalidation à faire par l'appelant)
+        """
+        stats = {
+            "items_written": 0,
+            "chunks": 0,
+            "delta": {"inserted": 0, "updated": 0, "unchanged": 0, "removed": 0},
+            "source_counts": {"items": 0, "recipes": 0, "harvest_loots": 0},
+            "timings": {"index": 0.0, "classify": 0.0, "write": 0.0, "total": 0.0}
+        }
+        started = time.perf_counter()
+        changed_ids: Set[int] = set()
+        loop = asyncio.get_running_loop()
+        db = SessionLocal()
+        try:
+            stage_start = time.perf_counter()
+            obtention_index = await asyncio.to_thread(
+                wakfu_cdn.build_obtention_index,
+                _counting(recipes or [], stats["source_counts"], "recipes"),
+                _counting(harvest_loots or [], stats["source_counts"], "harvest_loots")
+            )
+            # Empreintes actuelles: une seule requête sur deux colonnes
+            existing_hashes = dict(await asyncio.to_thread(
+                lambda: db.query(CachedItem.wakfu_id, CachedItem.content_hash).all()
+            ))
+            stats["timings"]["index"] = time.perf_counter() - stage_start
             
-            db.commit()
-            print("Cache des items mis à jour")
+            # Dédoublonnage par wakfu_id dans le paquet (ON CONFLICT ne peut toucher une ligne deux fois)
+            chunk: Dict[int, Dict] = {}
+            seen_ids: Set[int] = set()
+            partitions = _partitions(_counting(items, stats["source_counts"], "items"), ITEMS_CACHE_CHUNK_SIZE)
+            workers = stats["workers"] = self._analysis_workers()
+            # Paquets en cours de classification: assez pour occuper tous les workers
+            pending = deque()
+            exhausted = False
+            
+            executor = self._classify_executor(workers, obtention_index)
+            classify = self._classifier(executor, obtention_index)
+            try:
+                while True:
+                    stage_start = time.perf_counter()
+                    while not exhausted and len(pending) < workers * 2:
+                        partition = await asyncio.to_thread(next, partitions, None)
+                        if partition is None:
+                            exhausted = True
+                        else:
+                            pending.append((partition, loop.run_in_executor(executor, classify, partition)))
+                    if not pending:
+                        break
+                    
+                    partition, future = pending.popleft()
+                    classified = await future
+                    stats["timings"]["classify"] += time.perf_counter() - stage_start
+                    
+                    for item, (item_id, obtention_type, content_hash) in zip(partition, classified):
+                        if not item_id or item_id in seen_ids:
+                            continue
+                        seen_ids.add(item_id)
+                        
+                        if item_id not in existing_hashes:
+                            stats["delta"]["inserted"] += 1
+                        elif existing_hashes[item_id] != content_hash:
+                            stats["delta"]["updated"] += 1
+                        else:
+                            stats["delta"]["unchanged"] += 1
+                            continue
+                        
+                        changed_ids.add(item_id)
+                        chunk[item_id] = {
+                            "wakfu_id": item_id,
+                            "data_json": item,
+                            "obtention_type": obtention_type,
+                            "content_hash": content_hash
+                        }
+                        
+                        if len(chunk) >= ITEMS_CACHE_CHUNK_SIZE:
+                            await asyncio.to_thread(self._write_items_chunk, db, list(chunk.values()), stats)
+                            chunk = {}
+            finally:
+                # Arrêt du pool (attente des processus) sans bloquer la boucle
+                await asyncio.to_thread(executor.shutdown)
+            
+            if chunk:
+                await asyncio.to_thread(self._write_items_chunk, db, list(chunk.values()), stats)
+            
+            # Items disparus du CDN (seulement si le flux d'items n'était pas vide)
+            removed_ids = set(existing_hashes) - seen_ids if seen_ids else set()
+            if removed_ids:
+                await asyncio.to_thread(self._delete_items, db, sorted(removed_ids), stats)
+                changed_ids |= removed_ids
+            
+            stats["timings"]["total"] = time.perf_counter() - started
+            delta = stats["delta"]
+            print(
+                f"Cache des items mis à jour: {delta['inserted']} ajoutés, {delta['updated']} modifiés, "
+                f"{delta['removed']} supprimés, {delta['unchanged']} inchangés "
+                f"({stats['items_written']} items écrits en {stats['chunks']} paquets, "
+                f"{_rate(stats['source_counts']['items'], stats['timings']['total']):.0f} items/s; "
+                f"index {stats['timings']['index']:.2f}s, classification {stats['timings']['classify']:.2f}s "
+                f"sur {workers} workers, écriture {stats['timings']['write']:.2f}s)"
+            )
             
         except Exception as e:
-            db.rollback()
+            await asyncio.to_thread(db.rollback)
+            stats["error"] = str(e)
             print(f"Erreur mise à jour cache: {e}")
         finally:
-            db.close()
+            await asyncio.to_thread(db.close)
+        
+        stats["changed_items"] = len(changed_ids)
+        stats["changed_ids"] = changed_ids
+        return stats
+    
+    def _analysis_workers(self) -> int:
+        return settings.analysis_workers if settings.analysis_workers > 0 else (os.cpu_count() or 1)
+    
+    def _classify_executor(self, workers: int, obtention_index: Dict[str, Set[int]]) -> Executor:
+        """
+        Pool de classification: dans un pool de processus, l'index d'obtention est
+        transmis une fois par worker (initializer) et non avec chaque paquet
+        """
+        if workers <= 1:
+            return ThreadPoolExecutor(1)
+        return ProcessPoolExecutor(workers, initializer=_init_classify_worker, initargs=(obtention_index,))
+    
+    def _classifier(self, executor: Executor, obtention_index: Dict[str, Set[int]]):
+        """
+        Fonction de classification d'un paquet pour ce pool
+        
+        Un pool de threads partage le module avec les autres synchros: l'index y est
+        passé avec chaque paquet (sans copie) plutôt que par la variable globale.
+        """
+        if isinstance(executor, ProcessPoolExecutor):
+            return _classify_partition
+        return partial(_classify_partition, obtention_index=obtention_index)
+    
+    def _write_items_chunk(self, db: Session, rows: List[Dict], stats: Dict):
+        """Upsert d'un paquet d'items en une seule requête, puis commit"""
+        stage_start = time.perf_counter()
+        
+        stmt = upsert_insert(CachedItem.__table__).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[CachedItem.wakfu_id],
+            set_={
+                "data_json": stmt.excluded.data_json,
+                "obtention_type": stmt.excluded.obtention_type,
+                "content_hash": stmt.excluded.content_hash,
+                "last_updated": func.now()
+            }
+        )
+        db.execute(stmt)
+        db.commit()
+        
+        elapsed = time.perf_counter() - stage_start
+        stats["timings"]["write"] += elapsed
+        stats["items_written"] += len(rows)
+        stats["chunks"] += 1
+        print(f"Paquet {stats['chunks']}: {len(rows)} items écrits ({_rate(len(rows), elapsed):.0f} items/s)")
+    
+    def _delete_items(self, db: Session, item_ids: List[int], stats: Dict):
+        """Supprime par paquets les items qui ne sont plus dans le CDN"""
+        stage_start = time.perf_counter()
+        
+        for i in range(0, len(item_ids), ITEMS_CACHE_CHUNK_SIZE):
+            db.query(CachedItem).filter(
+                CachedItem.wakfu_id.in_(item_ids[i:i + ITEMS_CACHE_CHUNK_SIZE])
+            ).delete(synchronize_session=False)
+            db.commit()
+        
+        stats["timings"]["write"] += time.perf_counter() - stage_start
+        stats["delta"]["removed"] += len(item_ids)
     
     async def analyze_build_for_farming(self, build_id: int, items_ids: List[int]) -> Dict:
-        """Analyse un build pour générer la roadmap de farm"""
+        """Analyse un build pour générer la roadmap de farm (voir analyze_builds_for_farming)"""
+        results = await self.analyze_builds_for_farming({build_id: items_ids})
+        return results[build_id]
+    
+    async def analyze_builds_for_farming(self, builds: Dict[int, List[int]]) -> Dict[int, Dict]:
+        """
+        Analyse plusieurs builds en une passe
+        
+        Les items de tous les builds sont dédoublonnés et chargés une seule fois.
+        Chaque analyse stockée porte l'empreinte (content_hash) de l'item dont elle
+        est issue: seules les analyses absentes ou dont l'item a changé depuis
+        (synchro CDN) sont recalculées, les autres sont renvoyées telles quelles.
+        Les analyses recalculées sont enregistrées en un seul upsert sur
+        (build_id, item_id), sans doublons possibles entre appels concurrents.
+        
+        Args:
+            builds: {build_id: liste des items du build}
+            
+        Returns:
+            {build_id: résultat d'analyse} (ou {"error": ...} pour chaque build en cas d'échec)
+        """
+        return await asyncio.to_thread(self._analyze_builds, builds)
+    
+    def _analyze_builds(self, builds: Dict[int, List[int]]) -> Dict[int, Dict]:
         db = SessionLocal()
         try:
-            analysis_results = {
-                "build_id": build_id,
-                "total_items": len(items_ids),
-                "farm_breakdown": {
-                    "craft": [],
-                    "harvest": [],
-                    "shop": [],
-                    "treasure": [],
-                    "unknown": []
+            all_ids = list(dict.fromkeys(item_id for items_ids in builds.values() for item_id in items_ids))
+            
+            # Empreintes courantes des items et analyses déjà stockées (deux requêtes IN)
+            current_hashes = dict(
+                db.query(CachedItem.wakfu_id, CachedItem.content_hash).filter(
+                    CachedItem.wakfu_id.in_(all_ids)
+                ).all()
+            ) if all_ids else {}
+            stored: Dict[int, Dict[int, FarmAnalysis]] = {build_id: {} for build_id in builds}
+            for analysis in db.query(FarmAnalysis).filter(FarmAnalysis.build_id.in_(list(builds))).all():
+                stored[analysis.build_id][analysis.item_id] = analysis
+            
+            stale = {
+                build_id: {
+                    item_id for item_id in items_ids
+                    if item_id in current_hashes and (
+                        item_id not in stored[build_id]
+                        or current_hashes[item_id] is None
+                        or stored[build_id][item_id].item_hash != current_hashes[item_id]
+                    )
                 }
+                for build_id, items_ids in builds.items()
             }
             
-            for item_id in items_ids:
-                # Récupère l'item du cache
-                cached_item = db.query(CachedItem).filter(
-                    CachedItem.wakfu_id == item_id
-                ).first()
-                
-                if not cached_item:
-                    continue
-                
-                # Créer ou mettre à jour l'analyse de farm
-                existing_analysis = db.query(FarmAnalysis).filter(
-                    FarmAnalysis.build_id == build_id,
-                    FarmAnalysis.item_id == item_id
-                ).first()
-                
-                farm_data = self._generate_farm_data(cached_item)
-                
-                if existing_analysis:
-                    existing_analysis.obtention_type = cached_item.obtention_type
-                    existing_analysis.farm_data = farm_data
-                else:
-                    new_analysis = FarmAnalysis(
-                        build_id=build_id,
-                        item_id=item_id,
-                        obtention_type=cached_item.obtention_type,
-                        farm_data=farm_data
-                    )
-                    db.add(new_analysis)
-                
-                # Ajouter à la breakdown
-                obtention_type = cached_item.obtention_type or "unknown"
-                analysis_results["farm_breakdown"][obtention_type].append({
-                    "item_id": item_id,
-                    "item_name": cached_item.data_json.get("title", {}).get("fr", f"Item {item_id}"),
-                    "farm_data": farm_data
-                })
+            # Seuls les items à ré-analyser sont chargés en entier, une fois pour tous les builds
+            stale_ids = set().union(*stale.values()) if stale else set()
+            fresh = {}
+            if stale_ids:
+                for cached_item in db.query(CachedItem).filter(CachedItem.wakfu_id.in_(list(stale_ids))).all():
+                    fresh[cached_item.wakfu_id] = {
+                        "obtention_type": cached_item.obtention_type or "unknown",
+                        "farm_data": self._generate_farm_data(cached_item),
+                        "item_name": cached_item.data_json.get("title", {}).get("fr", f"Item {cached_item.wakfu_id}"),
+                        "item_hash": cached_item.content_hash
+                    }
             
+            rows = [
+                {"build_id": build_id, "item_id": item_id, **fresh[item_id]}
+                for build_id, item_ids in stale.items()
+                for item_id in item_ids if item_id in fresh
+            ]
+            if rows:
+                stmt = upsert_insert(FarmAnalysis.__table__).values(rows)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[FarmAnalysis.build_id, FarmAnalysis.item_id],
+                    set_={
+                        "obtention_type": stmt.excluded.obtention_type,
+                        "farm_data": stmt.excluded.farm_data,
+                        "item_name": stmt.excluded.item_name,
+                        "item_hash": stmt.excluded.item_hash
+                    }
+                )
+                db.execute(stmt)
+            
+            # Analyses d'items retirés des builds
+            build_items = {build_id: set(items_ids) for build_id, items_ids in builds.items()}
+            obsolete_ids = [
+                analysis.id
+                for build_id, analyses in stored.items()
+                for item_id, analysis in analyses.items() if item_id not in build_items[build_id]
+            ]
+            if obsolete_ids:
+                db.query(FarmAnalysis).filter(FarmAnalysis.id.in_(obsolete_ids)).delete(synchronize_session=False)
             db.commit()
-            return analysis_results
+            
+            cached_ids = set(current_hashes)
+            return {
+                build_id: self._build_analysis_result(
+                    build_id, items_ids, cached_ids, stale[build_id], fresh, stored[build_id]
+                )
+                for build_id, items_ids in builds.items()
+            }
             
         except Exception as e:
             db.rollback()
             print(f"Erreur analyse build: {e}")
-            return {"error": str(e)}
+            return {build_id: {"error": str(e)} for build_id in builds}
         finally:
             db.close()
     
+    def _build_analysis_result(self, build_id: int, items_ids: List[int], cached_ids: Set[int], stale_ids: Set[int],
+                               fresh: Dict[int, Dict], stored: Dict[int, FarmAnalysis]) -> Dict:
+        """Résultat d'analyse d'un build à partir des analyses recalculées ou stockées"""
+        analysis_results = {
+            "build_id": build_id,
+            "total_items": len(items_ids),
+            "farm_breakdown": {
+                "craft": [],
+                "harvest": [],
+                "shop": [],
+                "treasure": [],
+                "unknown": []
+            }
+        }
+        recomputed = set()
+        reused = set()
+        
+        for item_id in items_ids:
+            if item_id in stale_ids and item_id in fresh:
+                entry = fresh[item_id]
+                recomputed.add(item_id)
+            elif item_id in cached_ids and item_id not in stale_ids and item_id in stored:
+                analysis = stored[item_id]
+                entry = {
+                    "obtention_type": analysis.obtention_type,
+                    "farm_data": analysis.farm_data,
+                    "item_name": analysis.item_name or f"Item {item_id}"
+                }
+                reused.add(item_id)
+            else:
+                continue
+            
+            # Ajouter à la breakdown
+            analysis_results["farm_breakdown"].setdefault(entry["obtention_type"], []).append({
+                "item_id": item_id,
+                "item_name": entry["item_name"],
+                "farm_data": entry["farm_data"]
+            })
+        
+        analysis_results["recomputed"] = len(recomputed)
+        analysis_results["reused"] = len(reused)
+        return analysis_results
+    
     def _generate_farm_data(self, cached_item: CachedItem) -> Dict:
         """Génère les données de farm spécifiques selon le type d'obtention"""
         obtention_type = cached_item.obtention_type
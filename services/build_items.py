@@ -0,0 +1,66 @@
+"""
+Index inverse item -> builds (table build_items)
+
+Build.items_ids reste la source de vérité (JSON, ordre des items); build_items en
+est une copie normalisée et indexée, écrite à la création du build, qui permet de
+trouver les builds d'un item ou de compter la popularité des items sans décoder
+le JSON de chaque build. Les builds antérieurs à l'index ont été indexés par une
+migration unique (core/schema.py).
+"""
+
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from models.build import Build, BuildItem
+
+class BuildItemIndex:
+    def add_build(self, db: Session, build: Build):
+        """Indexe les items d'un build (dans la transaction de l'appelant, build déjà flushé)"""
+        rows = self._rows(build.id, build.items_ids)
+        if rows:
+            db.execute(BuildItem.__table__.insert(), rows)
+
+    def _rows(self, build_id: int, items_ids: Iterable[int]) -> List[Dict]:
+        return [
+            {"build_id": build_id, "item_id": item_id, "quantity": quantity}
+            for item_id, quantity in Counter(items_ids or []).items()
+        ]
+
+    def builds_using_items(self, db: Session, item_ids: List[int], limit: Optional[int] = None) -> List[Dict]:
+        """
+        Builds contenant au moins un des items, les plus récents d'abord
+
+        Returns:
+            [{"build_id", "build_name", "created_at", "matching_items"}]
+        """
+        if not item_ids:
+            return []
+
+        query = db.query(
+            Build.id, Build.build_name, Build.created_at, func.count(BuildItem.item_id)
+        ).join(BuildItem, BuildItem.build_id == Build.id).filter(
+            BuildItem.item_id.in_(item_ids)
+        ).group_by(Build.id, Build.build_name, Build.created_at).order_by(
+            Build.created_at.desc(), Build.id.desc()
+        )
+        if limit:
+            query = query.limit(limit)
+
+        return [
+            {"build_id": build_id, "build_name": build_name, "created_at": created_at, "matching_items": matching}
+            for build_id, build_name, created_at, matching in query.all()
+        ]
+
+    def item_popularity(self, db: Session, limit: int = 20) -> List[Dict]:
+        """Items les plus utilisés: nombre de builds qui les contiennent"""
+        rows = db.query(
+            BuildItem.item_id, func.count(BuildItem.build_id).label("builds_count")
+        ).group_by(BuildItem.item_id).order_by(
+            func.count(BuildItem.build_id).desc(), BuildItem.item_id
+        ).limit(limit).all()
+        return [{"item_id": item_id, "builds_count": builds_count} for item_id, builds_count in rows]
+
+build_items = BuildItemIndex()
\ No newline at end of file
@@ -0,0 +1,354 @@
+"""
+Ingestion en masse des monstres, drops et zones depuis le CDN Wakfu
+
+Remplace le scraping de l'encyclopédie (10-30 minutes) par la lecture en flux de
+monsters.json, monsterFamilies.json, drops.json et areas.json, écrits par paquets
+dans cached_monsters, monster_drops, zones et monster_zones.
+"""
+
+import asyncio
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import func, update
+from sqlalchemy.orm import Session
+
+from core.database import SessionLocal, upsert_insert
+from models.cache import CachedMonster, MonsterDrop
+from models.zones import Zone, MonsterZone
+from services.wakfu_cdn import cdn_definition, wakfu_cdn
+from services.generations import generations, DROPS, ZONES
+
+# Types de données CDN nécessaires à l'ingestion des drops
+DROP_DATA_TYPES = ["monsters", "monsterFamilies", "drops", "areas"]
+
+# Périmètre de synchro des drops dans l'état du miroir CDN
+DROPS_SYNC_SCOPE = "drops_ingestion"
+
+# Nombre de lignes écrites (et commitées) par requête
+INGEST_CHUNK_SIZE = 1000
+
+def _title(entry: Dict) -> Optional[str]:
+    title = entry.get("title")
+    if isinstance(title, dict):
+        return title.get("fr") or title.get("en")
+    return title or entry.get("name")
+
+class CDNIngestionService:
+    async def ingest_drops_from_cdn(self, force: bool = False) -> Dict:
+        """
+        Télécharge (miroir local, en parallèle) et ingère monstres, drops et zones
+
+        Args:
+            force: Ré-ingère même si les fichiers CDN n'ont pas changé
+
+        Returns:
+            Résumé: status ("success", "up_to_date" ou "error"), compteurs, timings
+        """
+        version = await wakfu_cdn.get_current_version()
+        data, timings = await wakfu_cdn.fetch_many(DROP_DATA_TYPES, version=version)
+        result = {"version": version, "fetch_seconds": timings}
+
+        if not data["monsters"] or not data["drops"]:
+            result.update(status="error", message="Impossible de récupérer les monstres ou les drops")
+            return result
+
+        fingerprints = wakfu_cdn.fingerprints(data)
+        if not force and wakfu_cdn.mirror.is_synced(DROPS_SYNC_SCOPE, fingerprints):
+            print(f"Données de drop {version} inchangées depuis la dernière ingestion")
+            result.update(status="up_to_date", message="Données de drop déjà à jour")
+            return result
+
+        # Lecture en flux et écritures bloquantes: hors de la boucle d'événements
+        stats = await asyncio.to_thread(
+            self.ingest,
+            monsters=data["monsters"],
+            families=data["monsterFamilies"] or [],
+            drops=data["drops"],
+            areas=data["areas"] or []
+        )
+        result.update(stats)
+
+        if "error" in stats:
+            result.update(status="error", message=stats["error"])
+        else:
+            wakfu_cdn.mirror.mark_synced(DROPS_SYNC_SCOPE, fingerprints)
+            result.update(status="success", message="Drops importés depuis le CDN")
+        return result
+
+    def ingest(
+        self,
+        monsters: Iterable[Dict],
+        families: Iterable[Dict],
+        drops: Iterable[Dict],
+        areas: Iterable[Dict]
+    ) -> Dict:
+        """
+        Écrit les données CDN en base par paquets (chaque fichier n'est parcouru qu'une fois)
+
+        Returns:
+            Compteurs par table et temps par étape
+        """
+        stats = {
+            "monsters_upserted": 0,
+            "zones_upserted": 0,
+            "monster_zones_added": 0,
+            "drops_added": 0,
+            "drops_updated": 0,
+            "timings": {}
+        }
+        started = time.perf_counter()
+        db = SessionLocal()
+        try:
+            stage_start = time.perf_counter()
+            family_names = {
+                cdn_definition(family).get("id"): _title(family)
+                for family in families
+                if cdn_definition(family).get("id")
+            }
+            stats["timings"]["families"] = time.perf_counter() - stage_start
+
+            stage_start = time.perf_counter()
+            monsters_info, monster_areas = self._ingest_monsters(db, monsters, family_names, stats)
+            stats["timings"]["monsters"] = time.perf_counter() - stage_start
+
+            stage_start = time.perf_counter()
+            zone_ids, area_zones, monster_areas = self._ingest_areas(db, areas, monster_areas, stats)
+            self._ingest_monster_zones(db, monster_areas, area_zones, zone_ids, stats)
+            stats["timings"]["zones"] = time.perf_counter() - stage_start
+
+            stage_start = time.perf_counter()
+            self._ingest_drops(db, drops, monsters_info, monster_areas, area_zones, zone_ids, stats)
+            stats["timings"]["drops"] = time.perf_counter() - stage_start
+
+            stats["timings"]["total"] = time.perf_counter() - started
+            print(
+                f"Ingestion CDN terminée en {stats['timings']['total']:.2f}s: "
+                f"{stats['monsters_upserted']} monstres, {stats['zones_upserted']} zones, "
+                f"{stats['monster_zones_added']} associations monstre/zone, "
+                f"{stats['drops_added']} drops ajoutés, {stats['drops_updated']} mis à jour"
+            )
+
+        except Exception as e:
+            db.rollback()
+            stats["error"] = str(e)
+            print(f"Erreur ingestion CDN: {e}")
+        finally:
+            db.close()
+
+        # Les paquets commités (même avant une erreur) invalident les résultats pré-calculés
+        generations.bump_now(DROPS, ZONES)
+        return stats
+
+    def _ingest_monsters(
+        self,
+        db: Session,
+        monsters: Iterable[Dict],
+        family_names: Dict[int, str],
+        stats: Dict
+    ) -> Tuple[Dict[int, Dict], Dict[int, Set[int]]]:
+        """Upsert des monstres par paquets; retourne nom/niveau par monstre et leurs areaIds"""
+        monsters_info: Dict[int, Dict] = {}
+        monster_areas: Dict[int, Set[int]] = {}
+        chunk: Dict[int, Dict] = {}
+
+        for monster in monsters:
+            definition = cdn_definition(monster)
+            monster_id = definition.get("id")
+            if not monster_id:
+                continue
+
+            name = _title(monster) or f"Monstre {monster_id}"
+            family_id = definition.get("familyId")
+            level = definition.get("level") or definition.get("levelMin")
+            monsters_info[monster_id] = {"name": name, "family_id": family_id, "level": level}
+
+            area_ids = definition.get("areaIds") or []
+            if area_ids:
+                monster_areas.setdefault(monster_id, set()).update(area_ids)
+
+            chunk[monster_id] = {
+                "wakfu_id": monster_id,
+                "name": name,
+                "family_id": family_id,
+                "level": level,
+                "data_json": {**monster, "family_name": family_names.get(family_id)}
+            }
+            if len(chunk) >= INGEST_CHUNK_SIZE:
+                self._upsert_monsters(db, list(chunk.values()), stats)
+                chunk = {}
+
+        if chunk:
+            self._upsert_monsters(db, list(chunk.values()), stats)
+
+        return monsters_info, monster_areas
+
+    def _upsert_monsters(self, db: Session, rows: List[Dict], stats: Dict):
+        stmt = upsert_insert(CachedMonster.__table__).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[CachedMonster.wakfu_id],
+            set_={
+                "name": stmt.excluded.name,
+                "family_id": stmt.excluded.family_id,
+                "level": stmt.excluded.level,
+                "data_json": stmt.excluded.data_json,
+                "last_updated": func.now()
+            }
+        )
+        db.execute(stmt)
+        db.commit()
+        stats["monsters_upserted"] += len(rows)
+
+    def _ingest_areas(
+        self,
+        db: Session,
+        areas: Iterable[Dict],
+        monster_areas: Dict[int, Set[int]],
+        stats: Dict
+    ) -> Tuple[Dict[str, int], Dict[int, str], Dict[int, Set[int]]]:
+        """
+        Upsert des zones (clé: nom) depuis areas.json
+
+        Returns:
+            (id de zone par nom, nom de zone par areaId CDN, areaIds par monstre complétés)
+        """
+        zone_rows: Dict[str, Dict] = {}
+        area_zones: Dict[int, str] = {}
+
+        for area in areas:
+            definition = cdn_definition(area)
+            area_id = definition.get("id")
+            name = _title(area)
+            if not area_id or not name:
+                continue
+
+            area_zones[area_id] = name
+            zone_rows[name] = {
+                "name": name,
+                "min_level": definition.get("minLevel"),
+                "max_level": definition.get("maxLevel")
+            }
+            for monster_id in definition.get("monsterIds") or []:
+                monster_areas.setdefault(monster_id, set()).add(area_id)
+
+        rows = list(zone_rows.values())
+        for i in range(0, len(rows), INGEST_CHUNK_SIZE):
+            stmt = upsert_insert(Zone.__table__).values(rows[i:i + INGEST_CHUNK_SIZE])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[Zone.name],
+                set_={
+                    "min_level": func.coalesce(stmt.excluded.min_level, Zone.__table__.c.min_level),
+                    "max_level": func.coalesce(stmt.excluded.max_level, Zone.__table__.c.max_level)
+                }
+            )
+            db.execute(stmt)
+            db.commit()
+        stats["zones_upserted"] += len(rows)
+
+        zone_ids = dict(db.query(Zone.name, Zone.id).all())
+        return zone_ids, area_zones, monster_areas
+
+    def _ingest_monster_zones(
+        self,
+        db: Session,
+        monster_areas: Dict[int, Set[int]],
+        area_zones: Dict[int, str],
+        zone_ids: Dict[str, int],
+        stats: Dict
+    ):
+        """Ajoute les associations monstre/zone manquantes (les associations manuelles sont conservées)"""
+        existing = set(db.query(MonsterZone.monster_id, MonsterZone.zone_id).all())
+
+        rows = []
+        for monster_id, area_ids in monster_areas.items():
+            for area_id in area_ids:
+                zone_id = zone_ids.get(area_zones.get(area_id))
+                if zone_id and (monster_id, zone_id) not in existing:
+                    existing.add((monster_id, zone_id))
+                    rows.append({"monster_id": monster_id, "zone_id": zone_id})
+
+        # Une association ajoutée entre-temps (admin) est ignorée au lieu de faire échouer l'ingestion
+        for i in range(0, len(rows), INGEST_CHUNK_SIZE):
+            stmt = upsert_insert(MonsterZone.__table__).values(rows[i:i + INGEST_CHUNK_SIZE])
+            added = db.execute(stmt.on_conflict_do_nothing().returning(MonsterZone.__table__.c.id)).all()
+            db.commit()
+            stats["monster_zones_added"] += len(added)
+
+    def _ingest_drops(
+        self,
+        db: Session,
+        drops: Iterable[Dict],
+        monsters_info: Dict[int, Dict],
+        monster_areas: Dict[int, Set[int]],
+        area_zones: Dict[int, str],
+        zone_ids: Dict[str, int],
+        stats: Dict
+    ):
+        """Insère les nouveaux drops et met à jour les taux modifiés, par paquets"""
+        existing = {
+            (monster_id, item_id): (drop_id, drop_rate)
+            for drop_id, monster_id, item_id, drop_rate in db.query(
+                MonsterDrop.id, MonsterDrop.monster_id, MonsterDrop.item_id, MonsterDrop.drop_rate
+            ).all()
+        }
+        to_insert: List[Dict] = []
+        to_update: List[Dict] = []
+
+        for drop in drops:
+            definition = cdn_definition(drop)
+            monster_id = definition.get("monsterId")
+            item_id = definition.get("itemId")
+            drop_rate = definition.get("dropRate", definition.get("rate"))
+            if not monster_id or not item_id or drop_rate is None:
+                continue
+
+            key = (monster_id, item_id)
+            if key in existing:
+                drop_id, current_rate = existing[key]
+                # drop_id None: doublon d'un drop inséré pendant cette ingestion
+                if drop_id is not None and (current_rate is None or abs(current_rate - drop_rate) > 0.01):
+                    to_update.append({"id": drop_id, "drop_rate": drop_rate})
+                    existing[key] = (drop_id, drop_rate)
+            else:
+                monster = monsters_info.get(monster_id, {})
+                zone_name = next(
+                    (area_zones[area_id] for area_id in sorted(monster_areas.get(monster_id, ())) if area_id in area_zones),
+                    None
+                )
+                to_insert.append({
+                    "monster_id": monster_id,
+                    "monster_name": monster.get("name") or f"Monstre {monster_id}",
+                    "monster_family_id": monster.get("family_id"),
+                    "monster_level": monster.get("level"),
+                    "item_id": item_id,
+                    "drop_rate": drop_rate,
+                    "zone_id": zone_ids.get(zone_name),
+                    "zone_name": zone_name
+                })
+                existing[key] = (None, drop_rate)
+
+            if len(to_insert) >= INGEST_CHUNK_SIZE:
+                self._flush_drops(db, to_insert, [], stats)
+                to_insert = []
+            if len(to_update) >= INGEST_CHUNK_SIZE:
+                self._flush_drops(db, [], to_update, stats)
+                to_update = []
+
+        self._flush_drops(db, to_insert, to_update, stats)
+
+    def _flush_drops(self, db: Session, to_insert: List[Dict], to_update: List[Dict], stats: Dict):
+        added = 0
+        if to_insert:
+            # Un drop inséré entre-temps par une autre ingestion ou un import est ignoré
+            stmt = upsert_insert(MonsterDrop.__table__).values(to_insert).on_conflict_do_nothing(
+                index_elements=[MonsterDrop.monster_id, MonsterDrop.item_id]
+            ).returning(MonsterDrop.id)
+            added = len(db.execute(stmt).all())
+        if to_update:
+            # UPDATE groupé par clé primaire (executemany)
+            db.execute(update(MonsterDrop), to_update)
+        db.commit()
+        stats["drops_added"] += added
+        stats["drops_updated"] += len(to_update)
+
+cdn_ingestion = CDNIngestionService()
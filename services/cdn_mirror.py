@@ -0,0 +1,102 @@
+"""
+Miroir local versionné des fichiers du CDN Wakfu
+
+Arborescence identique à celle du CDN, ce qui permet de servir le miroir tel quel
+comme source hors-ligne:
+
+    <root>/config.json                  version du dernier miroir complet
+    <root>/<version>/<type>.json        données brutes
+    <root>/<version>/<type>.meta.json   ETag / Last-Modified de la réponse
+    <root>/sync_state.json              empreintes des fichiers déjà analysés
+"""
+
+import json
+import os
+from datetime import datetime
+from typing import Dict, Optional
+
+from services.json_stream import JSONArrayFile
+
+class CDNMirror:
+    def __init__(self, root: str):
+        self.root = root
+
+    def data_path(self, version: str, data_type: str) -> str:
+        return os.path.join(self.root, version, f"{data_type}.json")
+
+    def meta_path(self, version: str, data_type: str) -> str:
+        return os.path.join(self.root, version, f"{data_type}.meta.json")
+
+    def read_meta(self, version: str, data_type: str) -> Optional[Dict]:
+        """Métadonnées HTTP d'un fichier miroir (None si le fichier n'est pas en miroir)"""
+        if not os.path.exists(self.data_path(version, data_type)):
+            return None
+        try:
+            with open(self.meta_path(version, data_type), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def write_meta(self, version: str, data_type: str, etag: Optional[str], last_modified: Optional[str]):
+        meta = {
+            "version": version,
+            "etag": etag,
+            "last_modified": last_modified,
+            "downloaded_at": datetime.utcnow().isoformat()
+        }
+        self._write_json(self.meta_path(version, data_type), meta)
+
+    def data_file(self, version: str, data_type: str) -> Optional[JSONArrayFile]:
+        """Fichier miroir lu en flux, avec son empreinte (None si absent)"""
+        path = self.data_path(version, data_type)
+        if not os.path.exists(path):
+            return None
+        return JSONArrayFile(path, fingerprint=self.fingerprint(version, data_type))
+
+    def fingerprint(self, version: str, data_type: str) -> Optional[str]:
+        """Identifie le contenu d'un fichier miroir: version + ETag (ou Last-Modified, ou taille)"""
+        meta = self.read_meta(version, data_type)
+        if meta is None:
+            return None
+        marker = meta.get("etag") or meta.get("last_modified") or os.path.getsize(self.data_path(version, data_type))
+        return f"{version}:{marker}"
+
+    def latest_version(self) -> Optional[str]:
+        """Version du dernier miroir complet (config.json local)"""
+        try:
+            with open(os.path.join(self.root, "config.json"), "r", encoding="utf-8") as f:
+                return json.load(f).get("version")
+        except (OSError, ValueError):
+            return None
+
+    def write_config(self, version: str):
+        """Marque une version comme miroir complet (même format que le config.json du CDN)"""
+        self._write_json(os.path.join(self.root, "config.json"), {"version": version})
+
+    def is_synced(self, scope: str, fingerprints: Dict[str, Optional[str]]) -> bool:
+        """True si ces fichiers ont déjà été analysés pour ce périmètre de synchro"""
+        if not fingerprints or any(value is None for value in fingerprints.values()):
+            return False
+        return self._load_sync_state().get(scope) == fingerprints
+
+    def mark_synced(self, scope: str, fingerprints: Dict[str, Optional[str]]):
+        if not fingerprints or any(value is None for value in fingerprints.values()):
+            return
+        state = self._load_sync_state()
+        state[scope] = fingerprints
+        self._write_json(os.path.join(self.root, "sync_state.json"), state)
+
+    def _load_sync_state(self) -> Dict:
+        try:
+            with open(os.path.join(self.root, "sync_state.json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_json(self, path: str, data: Dict):
+        """Écriture atomique (fichier temporaire puis renommage)"""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        partial = f"{path}.part"
+        with open(partial, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(partial, path)
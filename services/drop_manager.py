@@ -2,176 +2,98 @@
 Service pour gérer les données de drop (stockage et récupération)
 """
 
+from collections import defaultdict
 from typing import Dict, List, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
 from core.database import SessionLocal
 from models.cache import MonsterDrop, CachedMonster
 from models.zones import Zone, MonsterZone
-# from services.wakfu_scraper import WakfuScraper  # Module supprimé
+from services.harvest_sources import harvest_sources
+from services.generations import generations, DROPS
+from services.monster_catalog import monster_catalog
 import json
 
 class DropManager:
-    def __init__(self):
-        # self.scraper = WakfuScraper(delay_min=2.0, delay_max=4.0)  # Module supprimé
-        pass
+    """
+    Lecture des données de drop et génération des roadmaps
+    (l'import depuis le CDN est géré par services.cdn_ingestion)
+    """
     
-    async def import_drops_from_scraper(self, item_ids: List[int]) -> Dict:
-        """
-        Importe les données de drop pour une liste d'items
-        
-        Args:
-            item_ids: Liste des IDs d'items à scraper
-            
-        Returns:
-            Résumé de l'import
-        """
-        db = SessionLocal()
-        try:
-            results = {
-                'items_processed': 0,
-                'drops_added': 0,
-                'monsters_added': 0,
-                'errors': []
-            }
-            
-            for item_id in item_ids:
-                try:
-                    # Scraper les données de l'item
-                    item_data = await self.scraper.get_item_details(item_id)
-                    if not item_data:
-                        results['errors'].append(f"Item {item_id} non trouvé")
-                        continue
-                    
-                    results['items_processed'] += 1
-                    
-                    # Traiter chaque drop
-                    for drop in item_data.get('drops', []):
-                        if not drop.get('monster_id'):
-                            continue
-                        
-                        # Vérifier si le monstre existe en cache
-                        monster = db.query(CachedMonster).filter(
-                            CachedMonster.wakfu_id == drop['monster_id']
-                        ).first()
-                        
-                        if not monster:
-                            # Scraper les détails du monstre
-                            monster_details = await self.scraper.get_monster_details(drop['monster_id'])
-                            if monster_details:
-                                # Créer le monstre en cache
-                                monster = CachedMonster(
-                                    wakfu_id=drop['monster_id'],
-                                    name=monster_details['name'],
-                                    level=monster_details.get('level'),
-                                    family_id=None,  # À implémenter si nécessaire
-                                    data_json=monster_details
-                                )
-                                db.add(monster)
-                                db.flush()
-                                results['monsters_added'] += 1
-                        
-                        # Vérifier si le drop existe déjà
-                        existing_drop = db.query(MonsterDrop).filter(
-                            and_(
-                                MonsterDrop.monster_id == drop['monster_id'],
-                                MonsterDrop.item_id == item_id
-                            )
-                        ).first()
-                        
-                        if existing_drop:
-                            # Mettre à jour le taux si différent
-                            if drop.get('drop_rate') and existing_drop.drop_rate != drop['drop_rate']:
-                                existing_drop.drop_rate = drop['drop_rate']
-                        else:
-                            # Créer le nouveau drop
-                            new_drop = MonsterDrop(
-                                monster_id=drop['monster_id'],
-                                monster_name=drop.get('monster_name', 'Unknown'),
-                                item_id=item_id,
-                                drop_rate=drop.get('drop_rate', 0.0),
-                                zone_name=None  # À récupérer depuis monster_details si disponible
-                            )
-                            db.add(new_drop)
-                            results['drops_added'] += 1
-                    
-                    db.commit()
-                    
-                except Exception as e:
-                    db.rollback()
-                    results['errors'].append(f"Erreur item {item_id}: {str(e)}")
-                    continue
-            
-            return results
-            
-        finally:
-            db.close()
-            await self.scraper.close()
-    
-    def get_drops_for_items(self, item_ids: List[int]) -> Dict:
+    def get_drops_for_items(self, item_ids: List[int], db: Optional[Session] = None) -> Dict:
         """
         Récupère toutes les données de drop pour une liste d'items
         
+        Trois requêtes quel que soit le nombre d'items: drops, monstres en cache
+        et zones des monstres.
+        
         Args:
             item_ids: Liste des IDs d'items
+            db: Session de la requête appelante (sinon une session dédiée est ouverte)
             
         Returns:
             Dictionnaire organisé par item avec les infos de drop
         """
-        db = SessionLocal()
+        own_session = db is None
+        db = db or SessionLocal()
         try:
-            drops_data = {}
+            unique_ids = list(dict.fromkeys(item_ids))
+            drops = db.query(MonsterDrop).filter(
+                MonsterDrop.item_id.in_(unique_ids)
+            ).order_by(MonsterDrop.item_id, MonsterDrop.drop_rate.desc()).all() if unique_ids else []
             
-            for item_id in item_ids:
-                drops = db.query(MonsterDrop).filter(
-                    MonsterDrop.item_id == item_id
-                ).order_by(MonsterDrop.drop_rate.desc()).all()
-                
-                drops_data[item_id] = {
-                    'total_sources': len(drops),
-                    'drops': []
-                }
-                
-                for drop in drops:
-                    # Récupérer les infos du monstre si en cache
-                    monster = db.query(CachedMonster).filter(
-                        CachedMonster.wakfu_id == drop.monster_id
-                    ).first()
-                    
-                    # Récupérer les zones depuis notre table de zones
-                    monster_zones = db.query(MonsterZone, Zone).join(
-                        Zone, MonsterZone.zone_id == Zone.id
-                    ).filter(MonsterZone.monster_id == drop.monster_id).all()
-                    
-                    zones_list = [zone.name for _, zone in monster_zones]
-                    
-                    drop_info = {
-                        'monster_id': drop.monster_id,
-                        'monster_name': drop.monster_name,
-                        'monster_level': monster.level if monster else None,
-                        'drop_rate': drop.drop_rate,
-                        'zone_name': drop.zone_name,
-                        'zones': zones_list
-                    }
-                    
-                    drops_data[item_id]['drops'].append(drop_info)
+            monster_ids = list({drop.monster_id for drop in drops})
+            monster_levels = {}
+            monster_zones = defaultdict(list)
+            if monster_ids:
+                # Infos des monstres en cache
+                monster_levels = dict(
+                    db.query(CachedMonster.wakfu_id, CachedMonster.level).filter(
+                        CachedMonster.wakfu_id.in_(monster_ids)
+                    ).all()
+                )
+                # Zones depuis notre table de zones
+                for monster_id, zone_name in db.query(MonsterZone.monster_id, Zone.name).join(
+                    Zone, MonsterZone.zone_id == Zone.id
+                ).filter(MonsterZone.monster_id.in_(monster_ids)).all():
+                    monster_zones[monster_id].append(zone_name)
+            
+            drops_data = {
+                item_id: {'total_sources': 0, 'drops': []}
+                for item_id in unique_ids
+            }
+            for drop in drops:
+                drops_data[drop.item_id]['total_sources'] += 1
+                drops_data[drop.item_id]['drops'].append({
+                    'monster_id': drop.monster_id,
+                    'monster_name': drop.monster_name,
+                    'monster_level': monster_levels.get(drop.monster_id),
+                    'drop_rate': drop.drop_rate,
+                    'zone_name': drop.zone_name,
+                    'zones': list(monster_zones.get(drop.monster_id, []))
+                })
             
             return drops_data
             
         finally:
-            db.close()
+            if own_session:
+                db.close()
     
-    def get_farm_roadmap(self, item_ids: List[int]) -> Dict:
+    def get_farm_roadmap(self, item_ids: List[int], db: Optional[Session] = None,
+                         drops_data: Optional[Dict] = None) -> Dict:
         """
         Génère une roadmap de farm optimisée pour une liste d'items
         
         Args:
             item_ids: Liste des IDs d'items à farmer
+            db: Session de la requête appelante (sinon une session dédiée est ouverte)
+            drops_data: Drops déjà chargés par get_drops_for_items (évite de les relire)
             
         Returns:
             Roadmap organisée par zones/monstres avec structure pliable
         """
-        drops_data = self.get_drops_for_items(item_ids)
+        if drops_data is None:
+            drops_data = self.get_drops_for_items(item_ids, db=db)
         
         # Organiser par zones
         zones_map = {}
@@ -253,14 +175,26 @@ class DropManager:
                 ]
             })
         
+        # Sources de récolte des items du build (une requête pour tous les items)
+        if db is not None:
+            harvest = harvest_sources.get_sources_for_items(db, item_ids)
+        else:
+            db = SessionLocal()
+            try:
+                harvest = harvest_sources.get_sources_for_items(db, item_ids)
+            finally:
+                db.close()
+        
         return {
             'zones_organized': zones_organized,  # Nouvelle structure pour l'interface pliable
             'zones': dict(sorted_zones),  # Garder l'ancienne structure pour compatibilité
             'monsters': monsters_map,
+            'harvest': harvest,  # {item_id: sources de récolte}
             'summary': {
                 'total_items': len(item_ids),
                 'total_zones': len(zones_map),
-                'total_monsters': len(monsters_map)
+                'total_monsters': len(monsters_map),
+                'harvestable_items': len(harvest)
             }
         }
     
@@ -325,6 +259,8 @@ class DropManager:
                     except Exception as e:
                         results['errors'].append(f"Erreur drop {monster_id}->{item_id}: {str(e)}")
             
+            results['monsters_added'] = monster_catalog.add_missing_from_drops(db)
+            generations.bump(db, DROPS)
             db.commit()
             return results
             
@@ -0,0 +1,59 @@
+"""
+Générations des jeux de données (items, drops, zones, sources de récolte)
+
+Chaque modification d'un jeu de données incrémente sa génération. Les résultats
+pré-calculés (ex: roadmaps des builds) enregistrent les générations dont ils sont
+issus: ils sont périmés dès qu'une de ces générations a changé.
+"""
+
+from typing import Dict, Iterable
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from core.database import SessionLocal, upsert_insert
+from models.generation import DataGeneration
+
+ITEMS = "items"
+DROPS = "drops"
+ZONES = "zones"
+HARVEST = "harvest"
+GENERATION_NAMES = (ITEMS, DROPS, ZONES, HARVEST)
+
+class GenerationService:
+    def get_all(self, db: Session) -> Dict[str, int]:
+        """Générations courantes (0 pour un jeu de données jamais modifié)"""
+        generations = {name: 0 for name in GENERATION_NAMES}
+        generations.update(dict(db.query(DataGeneration.name, DataGeneration.value).all()))
+        return generations
+
+    def bump(self, db: Session, *names: str):
+        """
+        Incrémente des générations dans la transaction de l'appelant
+        (visible au commit, avec les modifications qui la justifient)
+        """
+        table = DataGeneration.__table__
+        for name in names:
+            stmt = upsert_insert(table).values(name=name, value=1)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.name],
+                set_={"value": table.c.value + 1, "updated_at": func.now()}
+            )
+            db.execute(stmt)
+
+    def bump_now(self, *names: str):
+        """Incrémente des générations dans une transaction dédiée (après des commits par paquets)"""
+        db = SessionLocal()
+        try:
+            self.bump(db, *names)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"Erreur mise à jour des générations {names}: {e}")
+        finally:
+            db.close()
+
+    def select(self, generations: Dict[str, int], names: Iterable[str]) -> Dict[str, int]:
+        return {name: generations.get(name, 0) for name in names}
+
+generations = GenerationService()
\ No newline at end of file
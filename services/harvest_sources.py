@@ -0,0 +1,118 @@
+"""
+Index des sources de récolte (item -> ressource / métier / taux)
+
+Les harvestLoots du CDN sont chargés dans harvest_sources à chaque synchro, pour
+répondre aux recherches d'un build entier en une requête au lieu de re-parcourir
+les loots.
+"""
+
+import time
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy.orm import Session
+
+from core.database import SessionLocal
+from models.cache import HarvestSource
+from services.generations import generations, HARVEST
+from services.wakfu_cdn import cdn_definition
+
+# Nombre de lignes insérées par requête
+HARVEST_CHUNK_SIZE = 1000
+
+# Colonnes comparées pour détecter un changement de l'index
+SOURCE_COLUMNS = ("item_id", "resource_id", "skill_id", "drop_rate", "quantity_min", "quantity_max")
+
+def _source_key(values: Tuple) -> Tuple:
+    """Ligne normalisée comme en base (taux flottant, autres colonnes entières)"""
+    return tuple(
+        None if value is None else (float(value) if column == "drop_rate" else int(value))
+        for column, value in zip(SOURCE_COLUMNS, values)
+    )
+
+class HarvestSourceService:
+    def ingest(self, harvest_loots: Iterable[Dict]) -> Dict:
+        """
+        Remplace l'index des sources de récolte (une transaction)
+
+        L'index n'est réécrit, et la génération HARVEST incrémentée (roadmaps
+        périmées), que si son contenu change.
+
+        Returns:
+            Compteurs, changed (index modifié) et temps de traitement
+        """
+        started = time.perf_counter()
+        stats = {"sources": 0, "items": 0, "changed": False}
+
+        rows: List[Dict] = []
+        item_ids = set()
+        for loot in harvest_loots:
+            definition = cdn_definition(loot)
+            item_id = definition.get("itemId")
+            if not item_id:
+                continue
+            rows.append({
+                "item_id": item_id,
+                "resource_id": definition.get("listId", definition.get("resourceId")),
+                "skill_id": definition.get("skillId", definition.get("professionId")),
+                "drop_rate": definition.get("dropRate", definition.get("rate")),
+                "quantity_min": definition.get("quantityMin", definition.get("quantity")),
+                "quantity_max": definition.get("quantityMax", definition.get("quantity"))
+            })
+            item_ids.add(item_id)
+
+        db = SessionLocal()
+        try:
+            existing = Counter(
+                _source_key(values)
+                for values in db.query(*(getattr(HarvestSource, column) for column in SOURCE_COLUMNS)).all()
+            )
+            incoming = Counter(_source_key(tuple(row[column] for column in SOURCE_COLUMNS)) for row in rows)
+            if incoming != existing:
+                db.query(HarvestSource).delete(synchronize_session=False)
+                for i in range(0, len(rows), HARVEST_CHUNK_SIZE):
+                    db.execute(HarvestSource.__table__.insert(), rows[i:i + HARVEST_CHUNK_SIZE])
+                generations.bump(db, HARVEST)
+                db.commit()
+                stats["changed"] = True
+            stats.update(sources=len(rows), items=len(item_ids))
+        except Exception as e:
+            db.rollback()
+            stats["error"] = str(e)
+            print(f"Erreur mise à jour des sources de récolte: {e}")
+        finally:
+            db.close()
+
+        stats["seconds"] = time.perf_counter() - started
+        print(
+            f"Sources de récolte: {stats['sources']} sources pour {stats['items']} items"
+            f"{'' if stats['changed'] else ' (inchangées)'}"
+        )
+        return stats
+
+    def get_sources_for_items(self, db: Session, item_ids: Iterable[int]) -> Dict[int, List[Dict]]:
+        """
+        Sources de récolte de plusieurs items en une seule requête
+
+        Returns:
+            {item_id: [sources triées par taux décroissant]} (items sans source absents)
+        """
+        item_ids = list(set(item_ids))
+        if not item_ids:
+            return {}
+
+        sources = defaultdict(list)
+        rows = db.query(HarvestSource).filter(
+            HarvestSource.item_id.in_(item_ids)
+        ).order_by(HarvestSource.item_id, HarvestSource.drop_rate.desc().nullslast()).all()
+        for row in rows:
+            sources[row.item_id].append({
+                "resource_id": row.resource_id,
+                "skill_id": row.skill_id,
+                "drop_rate": row.drop_rate,
+                "quantity_min": row.quantity_min,
+                "quantity_max": row.quantity_max
+            })
+        return dict(sources)
+
+harvest_sources = HarvestSourceService()
\ No newline at end of file
@@ -0,0 +1,111 @@
+"""
+Lecture incrémentale de fichiers JSON volumineux (tableau au premier niveau)
+"""
+
+import json
+import os
+from typing import Any, Iterator, Optional
+
+# Taille des blocs lus sur disque (caractères)
+READ_CHUNK_SIZE = 1 << 16
+
+_WHITESPACE = " \t\n\r"
+_NUMBER_CHARS = "0123456789.eE+-"
+
+def iter_json_array(path: str, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[Any]:
+    """
+    Itère paresseusement sur les éléments d'un tableau JSON stocké dans un fichier
+
+    Seuls le bloc courant et l'élément en cours de décodage sont en mémoire:
+    la consommation ne dépend pas de la taille du fichier.
+
+    Args:
+        path: Chemin du fichier JSON (doit contenir un tableau au premier niveau)
+        chunk_size: Taille des blocs lus sur disque
+
+    Yields:
+        Chaque élément du tableau, décodé
+    """
+    decoder = json.JSONDecoder()
+
+    with open(path, "r", encoding="utf-8") as f:
+        buffer = ""
+        pos = 0
+        eof = False
+
+        def read_more() -> bool:
+            nonlocal buffer, pos, eof
+            data = f.read(chunk_size)
+            if not data:
+                eof = True
+                return False
+            buffer = buffer[pos:] + data
+            pos = 0
+            return True
+
+        def next_token() -> str:
+            """Saute les espaces et retourne le prochain caractère ('' en fin de fichier)"""
+            nonlocal pos
+            while True:
+                while pos < len(buffer) and buffer[pos] in _WHITESPACE:
+                    pos += 1
+                if pos < len(buffer):
+                    return buffer[pos]
+                if not read_more():
+                    return ""
+
+        if next_token() != "[":
+            raise ValueError(f"{path}: tableau JSON attendu")
+        pos += 1
+
+        if next_token() == "]":
+            return
+
+        while True:
+            if not next_token():
+                raise ValueError(f"{path}: fin de fichier inattendue")
+            try:
+                value, end = decoder.raw_decode(buffer, pos)
+                # Un nombre en fin de bloc peut être tronqué ("12" de "123", "-2" de "-2.5"):
+                # relire avant de conclure
+                truncated = not eof and (end == len(buffer) or (
+                    isinstance(value, (int, float)) and buffer[end:].strip(_NUMBER_CHARS) == ""
+                ))
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                truncated = True
+
+            if truncated:
+                read_more()
+                continue
+
+            pos = end
+            yield value
+
+            separator = next_token()
+            if separator == "]":
+                return
+            if separator != ",":
+                raise ValueError(f"{path}: ',' ou ']' attendu, trouvé {separator!r}")
+            pos += 1
+
+class JSONArrayFile:
+    """
+    Tableau JSON sur disque, ré-itérable: chaque itération relit le fichier en flux
+    """
+
+    def __init__(self, path: str, fingerprint: Optional[str] = None):
+        self.path = path
+        # Identifiant du contenu (ex: version + ETag), utilisé pour éviter les ré-analyses
+        self.fingerprint = fingerprint
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter_json_array(self.path)
+
+    @property
+    def size_bytes(self) -> int:
+        return os.path.getsize(self.path)
+
+    def __repr__(self) -> str:
+        return f"JSONArrayFile({self.path!r})"
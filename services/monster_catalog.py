@@ -0,0 +1,128 @@
+"""
+Catalogue des monstres (cached_monsters) et recherche par nom
+
+cached_monsters contient un monstre par ligne (alimenté par la synchro CDN et les
+imports de drops); les imports qui n'écrivent que monster_drops y ajoutent leurs
+monstres par add_missing_from_drops, et les monstres importés avant le catalogue y
+ont été ajoutés par une migration unique (core/schema.py). La recherche et les
+assignations de zones s'appuient sur ce catalogue. La recherche utilise un index
+en mémoire des mots des noms (préfixes par bisection), reconstruit quand la
+génération des drops change, au lieu d'un SELECT DISTINCT ... ILIKE sur toute la
+table des drops.
+"""
+
+import unicodedata
+from bisect import bisect_left
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from core.database import upsert_insert
+from models.cache import CachedMonster, MonsterDrop
+from services.generations import generations, DROPS
+
+def normalize(text: str) -> str:
+    """Minuscules sans accents (\"Bouftou Royal\" et \"bouftou royal\" se valent)"""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(char for char in decomposed if not unicodedata.combining(char)).lower()
+
+def _tokens(text: str) -> List[str]:
+    return "".join(char if char.isalnum() else " " for char in normalize(text)).split()
+
+class _NameIndex:
+    """Noms des monstres triés, et mots des noms triés (recherche par préfixe)"""
+
+    def __init__(self, rows: List[Tuple[int, str, Optional[int]]]):
+        # (nom normalisé, id, nom, niveau), dans l'ordre d'affichage
+        self.monsters = sorted((normalize(name), wakfu_id, name, level) for wakfu_id, name, level in rows)
+        self._tokens = sorted(
+            (token, position)
+            for position, (_, _, name, _) in enumerate(self.monsters)
+            for token in set(_tokens(name))
+        )
+        self._token_keys = [token for token, _ in self._tokens]
+
+    def _prefix_matches(self, prefix: str) -> set:
+        start = bisect_left(self._token_keys, prefix)
+        matches = set()
+        for token, position in self._tokens[start:]:
+            if not token.startswith(prefix):
+                break
+            matches.add(position)
+        return matches
+
+    def search(self, query: str, limit: int) -> List[Tuple[str, int, str, Optional[int]]]:
+        """
+        Monstres dont chaque mot de la recherche commence un mot du nom, puis (si la
+        limite n'est pas atteinte) ceux dont le nom contient la recherche
+        """
+        words = _tokens(query)
+        if not words:
+            return self.monsters[:limit]
+
+        positions = self._prefix_matches(words[0])
+        for word in words[1:]:
+            positions &= self._prefix_matches(word)
+        results = sorted(positions)[:limit]
+
+        if len(results) < limit:
+            needle = normalize(query).strip()
+            found = set(results)
+            for position, monster in enumerate(self.monsters):
+                if position not in found and needle in monster[0]:
+                    results.append(position)
+                    if len(results) >= limit:
+                        break
+        return [self.monsters[position] for position in results]
+
+class MonsterCatalog:
+    def __init__(self):
+        self._generation: Optional[int] = None
+        self._index: Optional[_NameIndex] = None
+
+    def add_missing_from_drops(self, db: Session) -> int:
+        """
+        Ajoute à cached_monsters les monstres présents seulement dans monster_drops
+        (dans la transaction de l'appelant). Retourne le nombre de monstres ajoutés.
+        """
+        missing = db.query(
+            MonsterDrop.monster_id,
+            func.min(MonsterDrop.monster_name),
+            func.max(MonsterDrop.monster_family_id),
+            func.max(MonsterDrop.monster_level)
+        ).filter(
+            ~db.query(CachedMonster.id).filter(CachedMonster.wakfu_id == MonsterDrop.monster_id).exists()
+        ).group_by(MonsterDrop.monster_id).all()
+
+        rows = [
+            {
+                "wakfu_id": monster_id,
+                "name": name,
+                "family_id": family_id,
+                "level": level,
+                "data_json": {"name": name, "level": level, "source": "monster_drops"}
+            }
+            for monster_id, name, family_id, level in missing
+        ]
+        if rows:
+            stmt = upsert_insert(CachedMonster.__table__).values(rows)
+            db.execute(stmt.on_conflict_do_nothing(index_elements=[CachedMonster.wakfu_id]))
+        return len(rows)
+
+    def _get_index(self, db: Session) -> _NameIndex:
+        """Index des noms, reconstruit si la génération des drops a changé"""
+        generation = generations.get_all(db)[DROPS]
+        if self._index is None or self._generation != generation:
+            rows = db.query(CachedMonster.wakfu_id, CachedMonster.name, CachedMonster.level).all()
+            self._index, self._generation = _NameIndex(rows), generation
+        return self._index
+
+    def search(self, db: Session, query: Optional[str], limit: int = 20) -> List[Dict]:
+        """Recherche de monstres par nom (insensible à la casse et aux accents)"""
+        return [
+            {"monster_id": wakfu_id, "monster_name": name, "level": level}
+            for _, wakfu_id, name, level in self._get_index(db).search(query or "", limit)
+        ]
+
+monster_catalog = MonsterCatalog()
\ No newline at end of file
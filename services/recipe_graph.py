@@ -0,0 +1,277 @@
+"""
+Graphe des recettes et développement des arbres de craft
+
+Les recettes (recipes.json + recipeIngredients.json) sont chargées pendant la synchro
+CDN dans une liste d'adjacence indexée par item produit (recipe_ingredients). Chaque
+arbre est ensuite développé récursivement, avec mémoïsation des sous-recettes
+partagées, en quantités totales de matériaux de base (craft_materials): les
+requêtes ne font plus que lire et additionner ces totaux.
+"""
+
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from core.database import SessionLocal
+from models.cache import CachedItem, MonsterDrop
+from models.recipes import RecipeIngredient, CraftMaterials
+
+# Nombre de lignes insérées par requête
+RECIPE_CHUNK_SIZE = 1000
+
+# Adjacence: item produit -> [(ingrédient, quantité par exemplaire produit)]
+Adjacency = Dict[int, List[Tuple[int, float]]]
+
+def _recipe_cycles(adjacency: Adjacency) -> List[Set[int]]:
+    """
+    Composantes fortement connexes du graphe des recettes (Tarjan, itératif)
+
+    Returns:
+        Composantes dans l'ordre où leurs ingrédients sont déjà traités
+        (une composante n'utilise que des composantes qui la précèdent)
+    """
+    index: Dict[int, int] = {}
+    lowlink: Dict[int, int] = {}
+    stack: List[int] = []
+    on_stack: Set[int] = set()
+    components: List[Set[int]] = []
+
+    for root in adjacency:
+        if root in index:
+            continue
+        work = [(root, iter(adjacency.get(root, ())))]
+        index[root] = lowlink[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            item_id, ingredients = work[-1]
+            for ingredient_id, _ in ingredients:
+                if ingredient_id not in index:
+                    index[ingredient_id] = lowlink[ingredient_id] = len(index)
+                    stack.append(ingredient_id)
+                    on_stack.add(ingredient_id)
+                    work.append((ingredient_id, iter(adjacency.get(ingredient_id, ()))))
+                    break
+                if ingredient_id in on_stack:
+                    lowlink[item_id] = min(lowlink[item_id], index[ingredient_id])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[item_id])
+                if lowlink[item_id] == index[item_id]:
+                    component = set()
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.add(member)
+                        if member == item_id:
+                            break
+                    components.append(component)
+    return components
+
+def expand_recipe_graph(adjacency: Adjacency) -> Dict[int, Tuple[Dict[int, float], int]]:
+    """
+    Développe chaque item craftable en matériaux de base
+
+    Les sous-recettes partagées ne sont calculées qu'une fois: les items sont traités
+    ingrédients d'abord. Un item sans recette est un matériau de base. Dans un cycle
+    de recettes, les ingrédients appartenant au même cycle sont des matériaux de base
+    pour chaque item du cycle: le résultat ne dépend pas de l'item par lequel on entre
+    dans le cycle, et les items d'un cycle n'apparaissent que dans les arbres qui
+    l'utilisent.
+
+    Returns:
+        {item craftable: ({matériau de base: quantité pour 1 exemplaire}, profondeur)}
+    """
+    expansions: Dict[int, Tuple[Dict[int, float], int]] = {}
+
+    for component in _recipe_cycles(adjacency):
+        for item_id in component:
+            ingredients = adjacency.get(item_id)
+            if not ingredients:
+                continue
+
+            totals: Dict[int, float] = defaultdict(float)
+            depth = 0
+            for ingredient_id, quantity in ingredients:
+                if ingredient_id in expansions and ingredient_id not in component:
+                    sub_materials, sub_depth = expansions[ingredient_id]
+                    for base_id, base_quantity in sub_materials.items():
+                        totals[base_id] += base_quantity * quantity
+                    depth = max(depth, sub_depth + 1)
+                else:
+                    # Matériau de base, ou ingrédient du même cycle
+                    totals[ingredient_id] += quantity
+                    depth = max(depth, 1)
+            expansions[item_id] = (dict(totals), depth)
+
+    return expansions
+
+class RecipeGraphService:
+    def ingest(self, recipes: Iterable[Dict], recipe_ingredients: Iterable[Dict]) -> Dict:
+        """
+        Remplace le graphe des recettes et les arbres développés (une transaction)
+
+        Pour un item produit par plusieurs recettes, la recette de plus petit ID est retenue.
+
+        Returns:
+            Compteurs et temps par étape
+        """
+        stats = {"recipes": 0, "ingredients": 0, "craftable_items": 0, "timings": {}}
+        started = time.perf_counter()
+
+        # recipe_id -> (item produit, quantité produite)
+        recipe_results: Dict[int, Tuple[int, int]] = {}
+        for recipe in recipes:
+            recipe_id = recipe.get("id")
+            result_id = recipe.get("resultId") or recipe.get("productedItemId")
+            if recipe_id and result_id:
+                quantity = recipe.get("resultQuantity") or recipe.get("productOfCraft") or 1
+                recipe_results[recipe_id] = (result_id, quantity)
+        stats["recipes"] = len(recipe_results)
+
+        rows: List[Dict] = []
+        for ingredient in recipe_ingredients:
+            recipe_id = ingredient.get("recipeId")
+            item_id = ingredient.get("itemId")
+            if recipe_id not in recipe_results or not item_id:
+                continue
+            result_id, result_quantity = recipe_results[recipe_id]
+            rows.append({
+                "recipe_id": recipe_id,
+                "result_item_id": result_id,
+                "result_quantity": result_quantity,
+                "ingredient_item_id": item_id,
+                "quantity": ingredient.get("quantity") or 1
+            })
+        stats["ingredients"] = len(rows)
+        stats["timings"]["parse"] = time.perf_counter() - started
+
+        stage_start = time.perf_counter()
+        expansions = expand_recipe_graph(self._adjacency(rows))
+        stats["craftable_items"] = len(expansions)
+        stats["timings"]["expand"] = time.perf_counter() - stage_start
+
+        stage_start = time.perf_counter()
+        db = SessionLocal()
+        try:
+            db.query(RecipeIngredient).delete(synchronize_session=False)
+            db.query(CraftMaterials).delete(synchronize_session=False)
+            for i in range(0, len(rows), RECIPE_CHUNK_SIZE):
+                db.execute(RecipeIngredient.__table__.insert(), rows[i:i + RECIPE_CHUNK_SIZE])
+
+            material_rows = [
+                {
+                    "item_id": item_id,
+                    "materials": {str(base_id): quantity for base_id, quantity in materials.items()},
+                    "depth": depth
+                }
+                for item_id, (materials, depth) in expansions.items()
+            ]
+            for i in range(0, len(material_rows), RECIPE_CHUNK_SIZE):
+                db.execute(CraftMaterials.__table__.insert(), material_rows[i:i + RECIPE_CHUNK_SIZE])
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            stats["error"] = str(e)
+            print(f"Erreur mise à jour du graphe des recettes: {e}")
+        finally:
+            db.close()
+        stats["timings"]["write"] = time.perf_counter() - stage_start
+        stats["timings"]["total"] = time.perf_counter() - started
+
+        print(
+            f"Graphe des recettes: {stats['recipes']} recettes, {stats['ingredients']} ingrédients, "
+            f"{stats['craftable_items']} arbres développés en {stats['timings']['total']:.2f}s"
+        )
+        return stats
+
+    def _adjacency(self, rows: List[Dict]) -> Adjacency:
+        """Liste d'adjacence: une seule recette (plus petit ID) par item produit"""
+        chosen_recipe: Dict[int, int] = {}
+        for row in rows:
+            result_id = row["result_item_id"]
+            if result_id not in chosen_recipe or row["recipe_id"] < chosen_recipe[result_id]:
+                chosen_recipe[result_id] = row["recipe_id"]
+
+        adjacency: Adjacency = defaultdict(list)
+        for row in rows:
+            if chosen_recipe[row["result_item_id"]] == row["recipe_id"]:
+                adjacency[row["result_item_id"]].append(
+                    (row["ingredient_item_id"], row["quantity"] / row["result_quantity"])
+                )
+        return adjacency
+
+    def get_base_materials(self, db: Session, item_quantities: Dict[int, int]) -> Dict:
+        """
+        Matériaux de base pour un ensemble d'items (ex: tout un build), en requêtes constantes
+
+        Args:
+            item_quantities: {wakfu_id: nombre d'exemplaires voulus}
+
+        Returns:
+            Items craftables/non craftables et liste des matériaux de base triés par quantité,
+            chacun avec son nom, son type d'obtention et s'il se drop sur des monstres
+        """
+        item_ids = list(item_quantities)
+        expansions = {
+            row.item_id: row
+            for row in db.query(CraftMaterials).filter(CraftMaterials.item_id.in_(item_ids)).all()
+        } if item_ids else {}
+
+        totals: Dict[int, float] = defaultdict(float)
+        craftable = []
+        not_craftable = []
+        for item_id, count in item_quantities.items():
+            expansion = expansions.get(item_id)
+            if expansion is None:
+                not_craftable.append(item_id)
+                continue
+            craftable.append({"item_id": item_id, "depth": expansion.depth})
+            for base_id, quantity in expansion.materials.items():
+                totals[int(base_id)] += quantity * count
+
+        base_ids = list(totals)
+        item_info = {}
+        dropped_ids = set()
+        if base_ids:
+            item_info = {
+                wakfu_id: (name, obtention_type)
+                for wakfu_id, name, obtention_type in db.query(
+                    CachedItem.wakfu_id,
+                    CachedItem.data_json["title"]["fr"].as_string(),
+                    CachedItem.obtention_type
+                ).filter(CachedItem.wakfu_id.in_(base_ids)).all()
+            }
+            dropped_ids = {
+                item_id for (item_id,) in db.query(MonsterDrop.item_id).filter(
+                    MonsterDrop.item_id.in_(base_ids)
+                ).distinct().all()
+            }
+
+        materials = []
+        for base_id, quantity in sorted(totals.items(), key=lambda x: x[1], reverse=True):
+            name, obtention_type = item_info.get(base_id, (None, None))
+            materials.append({
+                "item_id": base_id,
+                "name": name or f"Item {base_id}",
+                "quantity": round(quantity, 2),
+                "obtention_type": obtention_type,
+                "droppable": base_id in dropped_ids
+            })
+
+        return {
+            "craftable_items": craftable,
+            "not_craftable_items": not_craftable,
+            "base_materials": materials,
+            "summary": {
+                "total_items": len(item_quantities),
+                "craftable": len(craftable),
+                "distinct_materials": len(materials)
+            }
+        }
+
+recipe_graph = RecipeGraphService()
\ No newline at end of file
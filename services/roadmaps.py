@@ -0,0 +1,203 @@
+"""
+Roadmaps de farm pré-calculées par contenu de build
+
+Un build est identifié par l'empreinte de ses items triés (content_hash): les
+builds identiques collés par plusieurs utilisateurs partagent une seule ligne
+build_contents, donc une seule roadmap calculée. Elle est stockée avec les
+générations des données utilisées et lue en une ligne; quand les drops, les zones
+ou les sources de récolte changent, la roadmap stockée reste servie (marquée
+"stale") pendant son recalcul en tâche de fond. Un item modifié par la synchro CDN
+ne périme que les contenus qui le contiennent (révision d'items par contenu).
+"""
+
+import hashlib
+import json
+from typing import Dict, Iterable, List, Optional, Set
+
+from fastapi import BackgroundTasks
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from core.database import SessionLocal, upsert_insert
+from models.build import Build, BuildContent
+from services.build_items import build_items
+from services.drop_manager import drop_manager
+from services.generations import generations, DROPS, ZONES, HARVEST
+
+# Données dont dépend une roadmap (drops, zones des monstres, sources de récolte)
+ROADMAP_GENERATIONS = (DROPS, ZONES, HARVEST)
+
+# Clé de la révision d'items du contenu dans les générations stockées
+ITEMS_REVISION = "items"
+
+# Nombre d'items modifiés traités par requête lors de l'invalidation
+INVALIDATION_CHUNK_SIZE = 500
+
+def build_content_hash(items_ids: List[int]) -> str:
+    """Empreinte canonique d'un build: SHA-1 de ses items triés (doublons inclus)"""
+    return hashlib.sha1(json.dumps(sorted(items_ids)).encode("utf-8")).hexdigest()
+
+class RoadmapService:
+    def __init__(self):
+        # Recalculs en cours dans ce processus (évite de les lancer plusieurs fois)
+        self._refreshing: Set[str] = set()
+
+    def get_or_create_content(self, db: Session, items_ids: List[int], build_id: Optional[int] = None) -> BuildContent:
+        """
+        Contenu partagé correspondant à une liste d'items (créé au besoin, sans commit)
+
+        Args:
+            build_id: Build en cours de création (devient porteur des analyses si le contenu est nouveau)
+        """
+        content_hash = build_content_hash(items_ids)
+        stmt = upsert_insert(BuildContent.__table__).values(
+            content_hash=content_hash, items_ids=sorted(items_ids), first_build_id=build_id
+        ).on_conflict_do_nothing(index_elements=[BuildContent.content_hash])
+        db.execute(stmt)
+
+        content = db.query(BuildContent).filter(BuildContent.content_hash == content_hash).first()
+        if content.first_build_id is None and build_id is not None:
+            content.first_build_id = build_id
+        return content
+
+    def analysis_owners(self, db: Session, builds: List[Build]) -> Dict[int, int]:
+        """
+        Build porteur des analyses de farm pour chaque build (une requête): les
+        builds identiques partagent les analyses du premier build de leur contenu
+        """
+        hashes = {build.content_hash for build in builds if build.content_hash}
+        first_builds = dict(
+            db.query(BuildContent.content_hash, BuildContent.first_build_id).filter(
+                BuildContent.content_hash.in_(hashes)
+            ).all()
+        ) if hashes else {}
+        return {build.id: first_builds.get(build.content_hash) or build.id for build in builds}
+
+    def get_build_roadmap(self, db: Session, build: Build, background_tasks: Optional[BackgroundTasks] = None,
+                          current: Optional[Dict[str, int]] = None) -> Dict:
+        """Roadmap d'un build enregistré (partagée entre builds identiques)"""
+        if build.content_hash is None:
+            build.content_hash = self.get_or_create_content(db, build.items_ids, build.id).content_hash
+            db.commit()
+        return self.get_items_roadmap(db, build.items_ids, background_tasks, current)
+
+    def current_generations(self, db: Session) -> Dict[str, int]:
+        """Générations des données dont dépendent les roadmaps"""
+        return generations.select(generations.get_all(db), ROADMAP_GENERATIONS)
+
+    def content_generations(self, db: Session, content_hash: Optional[str], current: Dict[str, int]) -> Dict[str, int]:
+        """Générations attendues pour la roadmap d'un contenu: données partagées + révision de ses items"""
+        revision = None
+        if content_hash is not None:
+            revision = db.query(BuildContent.items_revision).filter(
+                BuildContent.content_hash == content_hash
+            ).scalar()
+        return self._stamp(current, revision)
+
+    def _stamp(self, current: Dict[str, int], items_revision: Optional[int]) -> Dict[str, int]:
+        return dict(current, **{ITEMS_REVISION: items_revision or 0})
+
+    def get_items_roadmap(self, db: Session, items_ids: List[int], background_tasks: Optional[BackgroundTasks] = None,
+                          current: Optional[Dict[str, int]] = None) -> Dict:
+        """
+        Roadmap d'une liste d'items: lue depuis build_contents si elle existe
+
+        Une roadmap périmée est renvoyée telle quelle (stale=True) et recalculée en
+        tâche de fond si background_tasks est fourni, sinon immédiatement.
+        Une roadmap absente est calculée et stockée immédiatement si la liste est celle
+        d'un build enregistré; une liste anonyme (ex: build-from-text) est calculée sans
+        être stockée, pour que build_contents ne grossisse qu'avec les builds.
+
+        Args:
+            current: Générations déjà lues par l'appelant (ex: pour l'ETag)
+        """
+        current = current or self.current_generations(db)
+        content = db.query(BuildContent).filter(BuildContent.content_hash == build_content_hash(items_ids)).first()
+
+        if content and content.roadmap is not None:
+            if content.generations == self._stamp(current, content.items_revision):
+                return dict(content.roadmap, stale=False)
+
+            if background_tasks is not None:
+                if content.content_hash not in self._refreshing:
+                    self._refreshing.add(content.content_hash)
+                    background_tasks.add_task(self.refresh, content.content_hash)
+                return dict(content.roadmap, stale=True)
+
+        if content is None:
+            return dict(drop_manager.get_farm_roadmap(items_ids, db=db), stale=False)
+        roadmap = self._compute(db, content, current)
+        return dict(roadmap, stale=False)
+
+    def refresh(self, content_hash: str):
+        """Recalcule et stocke une roadmap partagée (tâche de fond)"""
+        db = SessionLocal()
+        try:
+            content = db.query(BuildContent).filter(BuildContent.content_hash == content_hash).first()
+            if content:
+                self._compute(db, content, self.current_generations(db))
+        except Exception as e:
+            db.rollback()
+            print(f"Erreur recalcul roadmap {content_hash}: {e}")
+        finally:
+            self._refreshing.discard(content_hash)
+            db.close()
+
+    def _compute(self, db: Session, content: BuildContent, current: Dict[str, int]) -> Dict:
+        """
+        Calcule et stocke une roadmap
+
+        Les générations et la révision d'items sont lues avant le calcul: une
+        modification concurrente laisse la roadmap marquée comme périmée, elle sera
+        recalculée.
+        """
+        stamp = self._stamp(current, content.items_revision)
+        roadmap = drop_manager.get_farm_roadmap(content.items_ids, db=db)
+        db.execute(
+            update(BuildContent)
+            .where(BuildContent.content_hash == content.content_hash)
+            .values(roadmap=roadmap, generations=stamp, computed_at=func.now())
+        )
+        db.commit()
+        return roadmap
+
+    def invalidate_items(self, item_ids: Iterable[int]) -> int:
+        """
+        Périme les roadmaps des contenus contenant ces items (révision d'items
+        incrémentée), via l'index build_items. Retourne le nombre de builds concernés.
+        """
+        item_ids = sorted(set(item_ids))
+        if not item_ids:
+            return 0
+
+        db = SessionLocal()
+        try:
+            build_ids = set()
+            for i in range(0, len(item_ids), INVALIDATION_CHUNK_SIZE):
+                build_ids.update(
+                    build["build_id"]
+                    for build in build_items.builds_using_items(db, item_ids[i:i + INVALIDATION_CHUNK_SIZE])
+                )
+
+            build_ids = sorted(build_ids)
+            for i in range(0, len(build_ids), INVALIDATION_CHUNK_SIZE):
+                db.execute(
+                    update(BuildContent)
+                    .where(BuildContent.content_hash.in_(
+                        select(Build.content_hash).where(Build.id.in_(build_ids[i:i + INVALIDATION_CHUNK_SIZE]))
+                    ))
+                    .values(items_revision=BuildContent.items_revision + 1)
+                    .execution_options(synchronize_session=False)
+                )
+            db.commit()
+            if build_ids:
+                print(f"Roadmaps périmées: {len(build_ids)} builds contenant {len(item_ids)} items modifiés")
+            return len(build_ids)
+        except Exception as e:
+            db.rollback()
+            print(f"Erreur invalidation des roadmaps: {e}")
+            return 0
+        finally:
+            db.close()
+
+roadmap_service = RoadmapService()
\ No newline at end of file
@@ -1,16 +1,78 @@
 import httpx
 import json
-from typing import Dict, List, Optional
+import asyncio
+import os
+import time
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 from core.config import settings
+from services.json_stream import JSONArrayFile
+from services.cdn_mirror import CDNMirror
+
+# Types de données nécessaires à la synchro du cache d'items
+SYNC_DATA_TYPES = ["items", "recipes", "recipeIngredients", "harvestLoots"]
+
+# Codes HTTP pour lesquels une nouvelle tentative a du sens
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Taille des blocs écrits sur disque lors des téléchargements en flux
+DOWNLOAD_CHUNK_SIZE = 1 << 16
+
+def cdn_definition(entry: Dict) -> Dict:
+    """Champs d'une entrée CDN, qu'ils soient sous 'definition' ou au premier niveau"""
+    if not isinstance(entry, dict):
+        return {}
+    definition = entry.get("definition")
+    return {**entry, **definition} if isinstance(definition, dict) else entry
 
 class WakfuCDNService:
     def __init__(self):
         self.base_url = settings.wakfu_cdn_base_url
         self.version = settings.wakfu_version
-        self.client = httpx.AsyncClient(timeout=60.0)
+        self.mirror = CDNMirror(settings.cdn_cache_dir)
+        # Client HTTP partagé (pool de connexions), ouvert/fermé par le lifespan de l'app
+        self._client: Optional[httpx.AsyncClient] = None
+        # Un seul téléchargement à la fois par fichier miroir (synchros concurrentes)
+        self._download_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+    
+    def _build_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            http2=settings.cdn_http2,
+            timeout=httpx.Timeout(settings.cdn_timeout, connect=10.0),
+            limits=httpx.Limits(
+                max_connections=settings.cdn_max_connections,
+                max_keepalive_connections=settings.cdn_max_keepalive_connections,
+                keepalive_expiry=settings.cdn_keepalive_expiry
+            )
+        )
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """
+        Client HTTP partagé
+        
+        Créé à la demande si le service est utilisé hors de l'app FastAPI
+        (ex: initialize.py), qui doit alors appeler close() en fin de script.
+        """
+        if self._client is None or self._client.is_closed:
+            self._client = self._build_client()
+        return self._client
+    
+    async def start(self):
+        """Ouvre le pool de connexions (lifespan de l'app)"""
+        self.client
+    
+    async def close(self):
+        """Ferme le client HTTP et son pool de connexions"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
     
     async def get_current_version(self) -> str:
-        """Récupère la version actuelle depuis config.json"""
+        """Récupère la version actuelle depuis config.json (depuis le miroir en mode hors-ligne)"""
+        if settings.cdn_offline:
+            return self.mirror.latest_version() or self.version
+        
         try:
             response = await self.client.get(f"{self.base_url}/config.json")
             response.raise_for_status()
@@ -20,16 +82,151 @@ class WakfuCDNService:
             print(f"Erreur récupération version: {e}")
             return self.version
     
-    async def fetch_data_type(self, data_type: str) -> Optional[Dict]:
-        """Récupère un type de données du CDN"""
-        try:
-            url = f"{self.base_url}/{self.version}/{data_type}.json"
-            response = await self.client.get(url)
+    async def _with_retries(self, data_type: str, attempt_fn):
+        """Exécute attempt_fn avec retries et backoff exponentiel (None si échec définitif)"""
+        max_retries = settings.cdn_max_retries
+        
+        for attempt in range(max_retries + 1):
+            try:
+                return await attempt_fn()
+            except Exception as e:
+                retryable = isinstance(e, httpx.TransportError) or (
+                    isinstance(e, httpx.HTTPStatusError)
+                    and e.response.status_code in RETRYABLE_STATUS_CODES
+                )
+                if not retryable or attempt == max_retries:
+                    print(f"Erreur fetch {data_type}: {e}")
+                    return None
+                
+                delay = settings.cdn_retry_backoff * (2 ** attempt)
+                print(f"Erreur fetch {data_type} (tentative {attempt + 1}/{max_retries + 1}): {e}, nouvel essai dans {delay:.1f}s")
+                await asyncio.sleep(delay)
+    
+    def _data_type_url(self, data_type: str, version: Optional[str] = None) -> str:
+        return f"{self.base_url}/{version or self.version}/{data_type}.json"
+    
+    async def fetch_data_type(self, data_type: str, version: Optional[str] = None) -> Optional[Dict]:
+        """Récupère un type de données du CDN en mémoire (avec retries et backoff exponentiel)"""
+        async def attempt():
+            response = await self.client.get(self._data_type_url(data_type, version))
             response.raise_for_status()
             return response.json()
-        except Exception as e:
-            print(f"Erreur fetch {data_type}: {e}")
-            return None
+        
+        return await self._with_retries(data_type, attempt)
+    
+    async def download_data_type(self, data_type: str, version: Optional[str] = None) -> Optional[JSONArrayFile]:
+        """
+        Télécharge un type de données en flux vers le miroir local versionné
+        
+        Le fichier n'est jamais chargé en mémoire: il est écrit par blocs, puis
+        exposé comme un tableau JSON lu paresseusement (JSONArrayFile).
+        Si le miroir contient déjà ce fichier, la requête est conditionnelle
+        (If-None-Match / If-Modified-Since): un 304 évite le re-téléchargement.
+        En mode hors-ligne (cdn_offline), seul le miroir est utilisé.
+        """
+        version = version or self.version
+        
+        if settings.cdn_offline:
+            mirrored = self.mirror.data_file(version, data_type)
+            if not mirrored:
+                print(f"Erreur fetch {data_type}: absent du miroir hors-ligne ({version})")
+            return mirrored
+        
+        target = self.mirror.data_path(version, data_type)
+        
+        async def attempt():
+            async with self._download_locks[target]:
+                return await download()
+        
+        async def download():
+            headers = {}
+            meta = self.mirror.read_meta(version, data_type)
+            if meta:
+                if meta.get("etag"):
+                    headers["If-None-Match"] = meta["etag"]
+                if meta.get("last_modified"):
+                    headers["If-Modified-Since"] = meta["last_modified"]
+            
+            async with self.client.stream("GET", self._data_type_url(data_type, version), headers=headers) as response:
+                if response.status_code == 304 and meta is not None:
+                    print(f"✔️ {data_type}: inchangé ({version}), miroir local réutilisé")
+                    return self.mirror.data_file(version, data_type)
+                
+                response.raise_for_status()
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                partial = f"{target}.part"
+                with open(partial, "wb") as f:
+                    async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                        f.write(chunk)
+                os.replace(partial, target)
+                self.mirror.write_meta(
+                    version, data_type,
+                    etag=response.headers.get("etag"),
+                    last_modified=response.headers.get("last-modified")
+                )
+            
+            return self.mirror.data_file(version, data_type)
+        
+        return await self._with_retries(data_type, attempt)
+    
+    async def fetch_many(
+        self,
+        data_types: List[str],
+        max_concurrency: Optional[int] = None,
+        stream: Optional[bool] = None,
+        version: Optional[str] = None
+    ) -> Tuple[Dict[str, Optional[Iterable[Dict]]], Dict[str, float]]:
+        """
+        Télécharge plusieurs types de données en parallèle (parallélisme borné)
+        
+        La durée totale est celle du fichier le plus lent plutôt que la somme des fichiers.
+        
+        Args:
+            data_types: Types à récupérer (ex: SYNC_DATA_TYPES)
+            max_concurrency: Téléchargements simultanés max (défaut: settings.cdn_max_concurrency)
+            stream: Si True, fichiers écrits dans le miroir local et lus en flux (JSONArrayFile)
+                    au lieu de listes en mémoire (défaut: settings.cdn_stream_to_disk)
+            version: Version du CDN à récupérer, dans les deux modes (défaut: get_current_version())
+            
+        Returns:
+            (données par type, durée de téléchargement par type en secondes)
+        """
+        if stream is None:
+            stream = settings.cdn_stream_to_disk
+        if version is None:
+            version = await self.get_current_version()
+        semaphore = asyncio.Semaphore(max_concurrency or settings.cdn_max_concurrency)
+        timings: Dict[str, float] = {}
+        
+        async def fetch_one(data_type: str):
+            async with semaphore:
+                start = time.perf_counter()
+                if stream:
+                    data = await self.download_data_type(data_type, version)
+                    size = f"{data.size_bytes / 1_000_000:.1f} Mo" if data else "échec"
+                else:
+                    data = await self.fetch_data_type(data_type, version)
+                    size = f"{len(data) if data else 0} entrées"
+                timings[data_type] = time.perf_counter() - start
+                print(f"📥 {data_type}: {size} en {timings[data_type]:.2f}s")
+                return data
+        
+        started = time.perf_counter()
+        results = await asyncio.gather(*(fetch_one(data_type) for data_type in data_types))
+        timings["total"] = time.perf_counter() - started
+        
+        # Miroir complet pour cette version: utilisable comme source hors-ligne
+        if stream and not settings.cdn_offline and all(result is not None for result in results):
+            self.mirror.write_config(version)
+        
+        return dict(zip(data_types, results)), timings
+    
+    def fingerprints(self, data: Dict[str, Optional[Iterable[Dict]]]) -> Dict[str, Optional[str]]:
+        """Empreintes des fichiers récupérés par fetch_many (None pour les données en mémoire)"""
+        return {
+            data_type: getattr(entries, "fingerprint", None)
+            for data_type, entries in data.items()
+        }
     
     async def get_items(self) -> Optional[List[Dict]]:
         """Récupère tous les items"""
@@ -69,30 +266,39 @@ class WakfuCDNService:
     
     def analyze_item_obtention(self, item: Dict, recipes: List[Dict], harvest_loots: List[Dict]) -> str:
         """Analyse comment obtenir un item"""
-        item_id = item.get("definition", {}).get("item", {}).get("id")
-        
+        return self.classify_item_obtention(item, self.build_obtention_index(recipes, harvest_loots))
+
+    def build_obtention_index(self, recipes: Iterable[Dict], harvest_loots: Iterable[Dict]) -> Dict[str, Set[int]]:
+        """
+        Construit les ensembles d'IDs craftables/récoltables une seule fois par sync,
+        pour classer chaque item en O(1) au lieu de parcourir recettes et loots
+        """
+        return {
+            "craft": {recipe.get("resultId") for recipe in recipes or [] if recipe.get("resultId")},
+            "harvest": {loot.get("itemId") for loot in harvest_loots or [] if loot.get("itemId")}
+        }
+
+    def classify_item_obtention(self, item: Dict, obtention_index: Dict[str, Set[int]]) -> str:
+        """Analyse comment obtenir un item à partir d'un index pré-calculé"""
+        item_data = item.get("definition", {}).get("item", {})
+        item_id = item_data.get("id")
+
         # Check si c'est dans les propriétés spéciales
-        properties = item.get("definition", {}).get("item", {}).get("properties", [])
+        properties = item_data.get("properties", [])
         if 7 in properties:  # Shop
             return "shop"
         if 1 in properties:  # Trésor
             return "treasure"
-        
+
         # Check si craftable
-        for recipe in recipes:
-            if recipe.get("resultId") == item_id:
-                return "craft"
-        
+        if item_id in obtention_index["craft"]:
+            return "craft"
+
         # Check si droppable/récoltable
-        for loot in harvest_loots:
-            if loot.get("itemId") == item_id:
-                return "harvest"
-        
+        if item_id in obtention_index["harvest"]:
+            return "harvest"
+
         # Par défaut
         return "unknown"
-    
-    async def close(self):
-        """Ferme le client HTTP"""
-        await self.client.aclose()
 
 wakfu_cdn = WakfuCDNService()
\ No newline at end of file
@@ -0,0 +1,158 @@
+"""
+Filtrage des roadmaps selon le niveau du joueur
+
+Les tranches de niveau des zones (min_level/max_level) sont chargées une fois dans
+un index d'intervalles trié, reconstruit seulement quand la génération des zones
+change: filtrer une roadmap ne coûte alors aucune requête supplémentaire.
+Les roadmaps pré-calculées restent partagées, le filtre est appliqué à la lecture.
+"""
+
+import copy
+from bisect import bisect_right
+from typing import Dict, List, Literal, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from models.zones import Zone
+from services.generations import generations, ZONES
+
+LevelFilterMode = Literal["rank", "exclude"]
+
+# Niveau maximum de Wakfu (bornes ouvertes des zones sans min/max)
+MAX_LEVEL = 245
+
+def _zone_totals(monsters) -> Tuple[int, float]:
+    """Nombre d'items et taux de drop moyen des monstres d'une zone"""
+    total_items = sum(len(monster["items"]) for monster in monsters)
+    total_rate = sum(item["drop_rate"] for monster in monsters for item in monster["items"])
+    return total_items, total_rate / total_items if total_items else 0
+
+class _IntervalIndex:
+    """Tranches de niveau des zones triées par borne basse"""
+
+    def __init__(self, rows: List[Tuple[str, Optional[int], Optional[int]]]):
+        self.ranges: Dict[str, Tuple[Optional[int], Optional[int]]] = {}
+        intervals = []
+        for name, min_level, max_level in rows:
+            self.ranges[name] = (min_level, max_level)
+            if min_level is not None or max_level is not None:
+                # Borne absente = tranche ouverte de ce côté
+                intervals.append((min_level or 0, max_level if max_level is not None else MAX_LEVEL, name))
+        intervals.sort()
+        self._starts = [start for start, _, _ in intervals]
+        self._intervals = intervals
+
+    def overlapping(self, low: int, high: int) -> Set[str]:
+        """Zones dont la tranche recoupe [low, high]"""
+        candidates = self._intervals[:bisect_right(self._starts, high)]
+        return {name for _, end, name in candidates if end >= low}
+
+class ZoneLevelService:
+    def __init__(self):
+        self._generation: Optional[int] = None
+        self._index: Optional[_IntervalIndex] = None
+
+    def get_index(self, db: Session, generation: Optional[int] = None) -> _IntervalIndex:
+        """Index des tranches de niveau, reconstruit si la génération des zones a changé"""
+        if generation is None:
+            generation = generations.get_all(db)[ZONES]
+        if self._index is None or self._generation != generation:
+            rows = db.query(Zone.name, Zone.min_level, Zone.max_level).all()
+            self._index, self._generation = _IntervalIndex(rows), generation
+        return self._index
+
+    def apply(self, db: Session, roadmap: Dict, player_level: int, tolerance: int = 10,
+              mode: LevelFilterMode = "rank", generation: Optional[int] = None) -> Dict:
+        """
+        Annote (et classe ou filtre) les zones et monstres d'une roadmap selon le niveau
+
+        Args:
+            player_level: Niveau du joueur
+            tolerance: Écart de niveau accepté de part et d'autre
+            mode: "rank" place les zones/monstres hors tranche en dernier,
+                  "exclude" les retire de la roadmap (dans les deux cas les
+                  correspondances passent avant les niveaux inconnus)
+            generation: Génération des zones déjà lue par l'appelant
+
+        Chaque zone reçoit level_range et level_match, chaque monstre level_match
+        (None si le niveau est inconnu: jamais exclu, classé après les correspondances).
+
+        Returns:
+            Copie filtrée: la roadmap reçue (éventuellement partagée) n'est pas modifiée
+        """
+        roadmap = copy.deepcopy(roadmap)
+        index = self.get_index(db, generation)
+        low, high = player_level - tolerance, player_level + tolerance
+        matching_zones = index.overlapping(low, high)
+
+        def zone_match(name: str) -> Optional[bool]:
+            min_level, max_level = index.ranges.get(name, (None, None))
+            if min_level is None and max_level is None:
+                return None
+            return name in matching_zones
+
+        def monster_match(level: Optional[int]) -> Optional[bool]:
+            return None if level is None else low <= level <= high
+
+        def rank(match: Optional[bool]) -> int:
+            return {True: 0, None: 1, False: 2}[match]
+
+        excluded_zones = set()
+        excluded_monsters = set()
+        zones_organized = []
+        for zone in roadmap.get("zones_organized", []):
+            min_level, max_level = index.ranges.get(zone["name"], (None, None))
+            zone["level_range"] = {"min": min_level, "max": max_level} if zone["name"] in index.ranges else None
+            zone["level_match"] = zone_match(zone["name"])
+            for monster in zone["monsters"]:
+                monster["level_match"] = monster_match(monster.get("level"))
+
+            if mode == "exclude":
+                excluded_monsters.update(m["id"] for m in zone["monsters"] if m["level_match"] is False)
+                zone["monsters"] = [m for m in zone["monsters"] if m["level_match"] is not False]
+                if zone["level_match"] is False or not zone["monsters"]:
+                    excluded_zones.add(zone["name"])
+                    continue
+                zone["total_items"], zone["avg_drop_rate"] = _zone_totals(zone["monsters"])
+            zone["monsters"].sort(key=lambda m: rank(m["level_match"]))
+            zones_organized.append(zone)
+
+        if mode == "exclude":
+            roadmap["zones"] = {
+                name: data for name, data in roadmap.get("zones", {}).items() if name not in excluded_zones
+            }
+            for data in roadmap["zones"].values():
+                data["monsters"] = {
+                    monster_id: monster for monster_id, monster in data["monsters"].items()
+                    if monster_match(monster.get("level")) is not False
+                }
+                data["total_items"], data["avg_drop_rate"] = _zone_totals(data["monsters"].values())
+            # Monstres sans zone inclus: seul leur niveau compte
+            monsters = roadmap.get("monsters", {})
+            excluded_monsters.update(
+                int(monster_id) for monster_id, monster in monsters.items()
+                if monster_match(monster.get("level")) is False
+            )
+            roadmap["monsters"] = {
+                monster_id: monster for monster_id, monster in monsters.items()
+                if monster_match(monster.get("level")) is not False
+            }
+        # Tri stable: l'ordre d'efficacité est conservé à l'intérieur de chaque groupe
+        zones_organized.sort(key=lambda zone: rank(zone["level_match"]))
+        roadmap["zones_organized"] = zones_organized
+
+        summary = roadmap.setdefault("summary", {})
+        if mode == "exclude":
+            summary["total_zones"] = len(zones_organized)
+            summary["total_monsters"] = len(roadmap["monsters"])
+        summary["level_filter"] = {
+            "player_level": player_level,
+            "level_tolerance": tolerance,
+            "mode": mode,
+            "matching_zones": sum(1 for zone in zones_organized if zone["level_match"]),
+            "excluded_zones": len(excluded_zones),
+            "excluded_monsters": len(excluded_monsters)
+        }
+        return roadmap
+
+zone_levels = ZoneLevelService()
\ No newline at end of file
@@ -0,0 +1,34 @@
+"""
+Tests de l'API sur une base SQLite temporaire
+
+DATABASE_URL est fixée avant tout import de l'application (settings lus à l'import).
+"""
+
+import os
+import tempfile
+
+_workdir = tempfile.mkdtemp(prefix="wakdrop_tests_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_workdir, 'tests.db')}"
+os.environ["CDN_CACHE_DIR"] = os.path.join(_workdir, "cdn")
+os.environ["CDN_OFFLINE"] = "true"
+
+import pytest
+from fastapi.testclient import TestClient
+
+@pytest.fixture(scope="session")
+def client():
+    import main
+
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+@pytest.fixture
+def db(client):
+    """Session sur la base de test (tables créées au démarrage de l'application)"""
+    from core.database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
\ No newline at end of file
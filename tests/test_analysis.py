@@ -0,0 +1,25 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from services.analysis import analysis_service
+
+def _item(item_id):
+    return {"definition": {"item": {"id": item_id, "baseParameters": {}, "properties": []}}}
+
+def test_thread_pool_classifiers_do_not_share_the_obtention_index():
+    craft_index = {"craft": {1}, "harvest": set()}
+    harvest_index = {"craft": set(), "harvest": {1}}
+
+    craft_pool = analysis_service._classify_executor(1, craft_index)
+    harvest_pool = analysis_service._classify_executor(1, harvest_index)
+    try:
+        assert isinstance(craft_pool, ThreadPoolExecutor)
+        classify_craft = analysis_service._classifier(craft_pool, craft_index)
+        classify_harvest = analysis_service._classifier(harvest_pool, harvest_index)
+
+        crafted = craft_pool.submit(classify_craft, [_item(1)]).result()
+        harvested = harvest_pool.submit(classify_harvest, [_item(1)]).result()
+    finally:
+        craft_pool.shutdown()
+        harvest_pool.shutdown()
+
+    assert (crafted[0][1], harvested[0][1]) == ("craft", "harvest")
\ No newline at end of file
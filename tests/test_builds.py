@@ -0,0 +1,23 @@
+def test_list_builds_follows_cursor_across_pages(client):
+    created = [
+        client.post("/builds/", json={"build_name": f"pagination-{i}", "items_ids": [i]}).json()["id"]
+        for i in range(5)
+    ]
+
+    seen = []
+    cursor = None
+    for _ in range(len(created) + 1):
+        params = {"limit": 2, "name_prefix": "pagination-"}
+        if cursor:
+            params["cursor"] = cursor
+        page = client.get("/builds/", params=params).json()
+        seen.extend(build["id"] for build in page["builds"])
+        cursor = page["next_cursor"]
+        if not cursor:
+            break
+
+    # Plus récent d'abord, chaque build une seule fois
+    assert seen == sorted(created, reverse=True)
+
+def test_list_builds_rejects_invalid_cursor(client):
+    assert client.get("/builds/", params={"cursor": "pas-un-curseur"}).status_code == 400
\ No newline at end of file
@@ -0,0 +1,14 @@
+from models.cache import MonsterDrop
+from services.cdn_ingestion import cdn_ingestion
+
+def test_drops_inserted_concurrently_are_not_duplicated(client, db):
+    row = {"monster_id": 66001, "monster_name": "Larve Bleue", "item_id": 66101, "drop_rate": 5.0}
+    db.add(MonsterDrop(**row))
+    db.commit()
+    stats = {"drops_added": 0, "drops_updated": 0}
+
+    # Instantané "existing" périmé: le drop est déjà en base quand l'ingestion l'insère
+    cdn_ingestion._flush_drops(db, [dict(row, drop_rate=6.0)], [], stats)
+
+    assert stats["drops_added"] == 0
+    assert db.query(MonsterDrop).filter(MonsterDrop.monster_id == 66001, MonsterDrop.item_id == 66101).count() == 1
\ No newline at end of file
@@ -0,0 +1,23 @@
+from services.generations import generations, HARVEST
+from services.harvest_sources import harvest_sources
+
+def test_fields_split_between_entry_and_definition_are_merged(client, db):
+    harvest_sources.ingest([
+        {"itemId": 88001, "definition": {"listId": 5, "skillId": 73, "dropRate": 12.5, "quantity": 2}}
+    ])
+
+    sources = harvest_sources.get_sources_for_items(db, [88001])
+
+    assert [(source["resource_id"], source["skill_id"]) for source in sources[88001]] == [(5, 73)]
+
+def test_only_changed_harvest_data_bumps_its_generation(client, db):
+    loots = [{"definition": {"itemId": 88011, "listId": 6, "skillId": 64, "dropRate": 10, "quantity": 1}}]
+    harvest_sources.ingest(loots)
+    before = generations.get_all(db)[HARVEST]
+
+    assert harvest_sources.ingest(loots)["changed"] is False
+    assert generations.get_all(db)[HARVEST] == before
+
+    loots[0]["definition"]["dropRate"] = 20
+    assert harvest_sources.ingest(loots)["changed"] is True
+    assert generations.get_all(db)[HARVEST] == before + 1
\ No newline at end of file
@@ -0,0 +1,29 @@
+from models.cache import CachedMonster, MonsterDrop
+from services.generations import generations, DROPS
+from services.monster_catalog import monster_catalog
+
+def test_search_matches_word_prefixes_without_accents(client, db):
+    db.add_all([
+        CachedMonster(wakfu_id=77001, name="Écaflip Sauvage", level=40, data_json={}),
+        CachedMonster(wakfu_id=77002, name="Bouftou Royal", level=30, data_json={})
+    ])
+    generations.bump(db, DROPS)
+    db.commit()
+
+    results = client.get("/admin/zones/monsters/search", params={"q": "ecaf sau"}).json()
+
+    assert [result["monster_id"] for result in results] == [77001]
+
+def test_search_limit_is_bounded(client):
+    assert client.get("/admin/zones/monsters/search", params={"limit": 0}).status_code == 422
+    assert client.get("/admin/zones/monsters/search", params={"limit": 101}).status_code == 422
+
+def test_monsters_known_only_from_drops_are_added(db):
+    db.add(MonsterDrop(monster_id=77101, monster_name="Tofu Mutant", monster_level=12, item_id=1, drop_rate=2.0))
+    db.flush()
+
+    assert monster_catalog.add_missing_from_drops(db) >= 1
+    db.commit()
+
+    monster = db.query(CachedMonster).filter(CachedMonster.wakfu_id == 77101).one()
+    assert (monster.name, monster.level) == ("Tofu Mutant", 12)
\ No newline at end of file
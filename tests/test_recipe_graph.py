@@ -0,0 +1,45 @@
+import time
+
+from services.recipe_graph import expand_recipe_graph
+
+def test_shared_subrecipes_are_expanded_once_into_base_materials():
+    adjacency = {
+        1: [(2, 2), (3, 1)],
+        2: [(3, 5)],
+    }
+
+    expansions = expand_recipe_graph(adjacency)
+
+    assert expansions[2] == ({3: 5.0}, 1)
+    assert expansions[1] == ({3: 11.0}, 2)
+
+def test_cycle_expansion_does_not_depend_on_entry_point():
+    # 10 -> 11 -> 10 est un cycle; 20 utilise 11 sans passer par 10
+    adjacency = {
+        10: [(11, 1)],
+        11: [(10, 1), (12, 1)],
+        20: [(11, 1)],
+    }
+
+    expansions = expand_recipe_graph(adjacency)
+
+    # Les ingrédients du même cycle sont des matériaux de base
+    assert expansions[10] == ({11: 1.0}, 1)
+    assert expansions[11] == ({10: 1.0, 12: 1.0}, 1)
+    # 20 reçoit le développement de 11, quel que soit l'ordre de calcul
+    assert expansions[20] == ({10: 1.0, 12: 1.0}, 2)
+    assert expand_recipe_graph(dict(reversed(list(adjacency.items())))) == expansions
+
+def test_large_cyclic_graph_is_expanded_in_linear_time():
+    # Chaîne de 5000 recettes refermée en boucle, avec un raccourci tous les 10 items
+    size = 5000
+    adjacency = {
+        item_id: [((item_id + 1) % size, 1), ((item_id + 10) % size, 1), (size + item_id, 2)]
+        for item_id in range(size)
+    }
+
+    started = time.perf_counter()
+    expansions = expand_recipe_graph(adjacency)
+
+    assert time.perf_counter() - started < 5
+    assert expansions[0][0] == {1: 1.0, 10: 1.0, size: 2.0}
\ No newline at end of file
@@ -0,0 +1,37 @@
+from models.build import BuildContent
+from services.roadmaps import build_content_hash, roadmap_service
+
+def test_anonymous_item_lists_are_not_stored(db):
+    items_ids = [880001, 880002]
+
+    roadmap = roadmap_service.get_items_roadmap(db, items_ids)
+
+    assert roadmap["stale"] is False
+    assert db.query(BuildContent).filter(
+        BuildContent.content_hash == build_content_hash(items_ids)
+    ).first() is None
+
+def test_saved_builds_share_one_stored_roadmap(client, db):
+    items_ids = [880011, 880012]
+    first = client.post("/builds/", json={"build_name": "contenu A", "items_ids": items_ids}).json()["id"]
+    second = client.post("/builds/", json={"build_name": "contenu B", "items_ids": items_ids[::-1]}).json()["id"]
+
+    for build_id in (first, second):
+        assert client.get(f"/builds/{build_id}/roadmap").status_code == 200
+
+    content = db.query(BuildContent).filter(
+        BuildContent.content_hash == build_content_hash(items_ids)
+    ).one()
+    assert content.first_build_id == first
+    assert content.roadmap is not None
+
+def test_changed_items_only_invalidate_builds_containing_them(client, db):
+    changed = client.post("/builds/", json={"build_name": "contient 880021", "items_ids": [880021, 880022]}).json()["id"]
+    untouched = client.post("/builds/", json={"build_name": "sans 880021", "items_ids": [880023]}).json()["id"]
+    etags = {build_id: client.get(f"/builds/{build_id}/roadmap").headers["ETag"] for build_id in (changed, untouched)}
+
+    assert roadmap_service.invalidate_items([880021]) == 1
+
+    # Build modifié: l'ancien ETag n'est plus valide; l'autre build reste en cache
+    assert client.get(f"/builds/{changed}/roadmap", headers={"If-None-Match": etags[changed]}).status_code == 200
+    assert client.get(f"/builds/{untouched}/roadmap", headers={"If-None-Match": etags[untouched]}).status_code == 304
\ No newline at end of file
@@ -0,0 +1,26 @@
+import asyncio
+
+import httpx
+
+from services.wakfu_cdn import WakfuCDNService
+
+def test_in_memory_fetch_uses_the_requested_version():
+    requested = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requested.append(str(request.url))
+        return httpx.Response(200, json=[])
+
+    cdn = WakfuCDNService()
+
+    async def fetch():
+        cdn._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        try:
+            return await cdn.fetch_many(["items", "recipes"], stream=False, version="1.99.0.1")
+        finally:
+            await cdn.close()
+
+    data, _ = asyncio.run(fetch())
+
+    assert data == {"items": [], "recipes": []}
+    assert sorted(requested) == [f"{cdn.base_url}/1.99.0.1/items.json", f"{cdn.base_url}/1.99.0.1/recipes.json"]
\ No newline at end of file
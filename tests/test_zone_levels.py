@@ -0,0 +1,55 @@
+import copy
+
+from models.zones import Zone
+from services.zone_levels import zone_levels
+
+def _roadmap():
+    low = {"id": 1, "name": "Bouftou", "level": 10, "items": [{"item_id": 1, "drop_rate": 4.0}]}
+    high = {"id": 2, "name": "Dragon", "level": 180, "items": [{"item_id": 1, "drop_rate": 2.0}]}
+    return {
+        "zones_organized": [{
+            "name": "Niveaux mixtes", "total_items": 2, "avg_drop_rate": 3.0, "expanded": False,
+            "monsters": [high, low]
+        }],
+        "zones": {
+            "Niveaux mixtes": {
+                "total_items": 2, "avg_drop_rate": 3.0, "expanded": False,
+                "monsters": {"2": dict(high), "1": dict(low)}
+            }
+        },
+        "monsters": {"1": dict(low), "2": dict(high)},
+        "summary": {"total_items": 1, "total_zones": 1, "total_monsters": 2}
+    }
+
+def test_exclude_recomputes_both_zone_structures_without_touching_input(db):
+    db.add(Zone(name="Niveaux mixtes", min_level=1, max_level=200))
+    db.commit()
+    roadmap = _roadmap()
+    original = copy.deepcopy(roadmap)
+
+    filtered = zone_levels.apply(db, roadmap, player_level=12, tolerance=5, mode="exclude", generation=-1)
+
+    assert roadmap == original
+    zone = filtered["zones_organized"][0]
+    assert [monster["id"] for monster in zone["monsters"]] == [1]
+    assert (zone["total_items"], zone["avg_drop_rate"]) == (1, 4.0)
+    legacy = filtered["zones"]["Niveaux mixtes"]
+    assert list(legacy["monsters"]) == ["1"]
+    assert (legacy["total_items"], legacy["avg_drop_rate"]) == (1, 4.0)
+    assert filtered["summary"]["total_monsters"] == 1
+
+def test_rank_keeps_every_monster_in_range_first(db):
+    filtered = zone_levels.apply(db, _roadmap(), player_level=178, tolerance=5, mode="rank", generation=-2)
+
+    zone = filtered["zones_organized"][0]
+    assert [(monster["id"], monster["level_match"]) for monster in zone["monsters"]] == [(2, True), (1, False)]
+
+def test_exclude_keeps_monsters_without_zone_by_level(db):
+    roadmap = _roadmap()
+    roadmap["monsters"]["3"] = {"name": "Tofu", "level": 12, "zones": [], "items": [{"item_id": 1, "drop_rate": 1.0}]}
+    roadmap["monsters"]["4"] = {"name": "Chafer", "level": 90, "zones": [], "items": [{"item_id": 1, "drop_rate": 1.0}]}
+
+    filtered = zone_levels.apply(db, roadmap, player_level=12, tolerance=5, mode="exclude", generation=-3)
+
+    assert sorted(filtered["monsters"]) == ["1", "3"]
+    assert filtered["summary"]["level_filter"]["excluded_monsters"] == 2
\ No newline at end of file
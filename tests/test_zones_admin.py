@@ -0,0 +1,50 @@
+from models.cache import CachedMonster
+from models.zones import Zone
+
+def _zone_with_monsters(db, name, monster_ids):
+    zone = Zone(name=name)
+    db.add(zone)
+    db.add_all([
+        CachedMonster(wakfu_id=monster_id, name=f"Monstre {monster_id}", data_json={})
+        for monster_id in monster_ids
+    ])
+    db.commit()
+    return zone.id
+
+def test_bulk_csv_reports_rows_with_extra_fields_as_invalid(client, db):
+    zone_id = _zone_with_monsters(db, "Zone CSV", [9101, 9102])
+    content = f"zone_id,monster_id\n{zone_id},9101\n{zone_id},9102,extra\n{zone_id},abc\n"
+
+    response = client.post(
+        "/admin/zones/monster-zones/bulk-csv",
+        files={"file": ("assignments.csv", content.encode(), "text/csv")}
+    )
+
+    assert response.status_code == 200
+    statuses = [result["status"] for result in response.json()["results"]]
+    assert statuses == ["created", "invalid", "invalid"]
+
+def test_bulk_reports_per_row_outcomes(client, db):
+    zone_id = _zone_with_monsters(db, "Zone JSON", [9201])
+    assignments = [
+        {"zone_id": zone_id, "monster_id": 9201},
+        {"zone_id": zone_id, "monster_id": 9201},
+        {"zone_id": zone_id, "monster_id": 9299},
+        {"zone_id": 999999, "monster_id": 9201}
+    ]
+
+    first = client.post("/admin/zones/monster-zones/bulk", json={"assignments": assignments}).json()
+    again = client.post("/admin/zones/monster-zones/bulk", json={"assignments": assignments[:1]}).json()
+
+    assert [result["status"] for result in first["results"]] == [
+        "created", "duplicate", "monster_not_found", "zone_not_found"
+    ]
+    assert again["results"][0]["status"] == "already_assigned"
+
+def test_monsters_without_drops_can_be_assigned(client, db):
+    # Monstre du catalogue CDN sans aucun drop: proposé par la recherche, donc assignable
+    zone_id = _zone_with_monsters(db, "Zone sans drops", [9301])
+
+    response = client.post(f"/admin/zones/zones/{zone_id}/monsters", json={"monster_id": 9301})
+
+    assert response.status_code == 200
\ No newline at end of file